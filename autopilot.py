@@ -0,0 +1,302 @@
+"""Soak test: plays the console unattended and logs the heap after every game.
+
+Runs on the Pico (`mpremote run autopilot.py`) or headless on a computer
+with the stubs in host_stubs.py (`python autopilot.py --cycles 50`).
+
+The console's buttons are replaced by pins driven from here, then main.py
+is started as usual. Each cycle picks the next game in the menu, launches
+it, plays for PLAY_MS (Breakout keeps the paddle under the ball, Star
+Catcher moves towards the lowest star, start and game-over screens are
+dismissed with A) and leaves with a double click on X. Back in the menu,
+one line is appended to LOG_FILE:
+
+    cycle,seconds,game,heap_free,largest_block,p50_ms,p95_ms,p99_ms,launch_ms,frames,trend
+
+launch_ms runs from the A press in the menu to the game's first frame.
+trend names the figures (heap_free, largest_block) that fell by more than
+TREND_MIN_DROP bytes across the last TREND_WINDOW cycles, by a least-squares
+fit; a falling largest block with a steady heap_free means fragmentation.
+"""
+import gc
+import sys
+import time
+from array import array
+
+PLAY_MS = 20000  # Time spent in each game
+CYCLES = 0  # Stop after this many cycles; 0 runs until the board is reset
+LOG_FILE = "soak.log"
+WARMUP_CYCLES = 3  # Left out of the trend: modules are still being loaded
+TREND_WINDOW = 20  # Cycles in the trend fit
+TREND_MIN_DROP = 2048  # Bytes lost across the window that count as a leak
+LAUNCH_TIMEOUT_MS = 15000  # Give up on a launch (e.g. an error screen) after this long
+PULSE_ON_MS = 60  # Button taps: held this long ...
+PULSE_PERIOD_MS = 300  # ... once per period
+DEAD_ZONE = 4  # Pixels either side of the target where the player stands still
+
+console = None  # Imported by install(), after machine.Pin is replaced
+_gpio_masks = {}  # Button GPIO -> console.BUTTON_* mask
+
+# --- State ---
+_phase = "menu"  # menu, launch, play, exit
+_phase_ms = 0
+_target = 0  # Menu index of the next game
+_cycle = 0
+_game_name = ""
+_launch_ms = 0
+_launch_failures = 0
+_start_ms = 0
+_mask = 0
+_mask_ms = -1
+_free = array("i", bytes(4 * TREND_WINDOW))  # Rings of post-warmup samples
+_largest = array("i", bytes(4 * TREND_WINDOW))
+_samples = 0
+_log_file = None
+
+
+def _set_phase(phase, now):
+    global _phase, _phase_ms
+    _phase = phase
+    _phase_ms = now
+
+
+def _pulse(now, mask):
+    return mask if time.ticks_diff(now, _phase_ms) % PULSE_PERIOD_MS < PULSE_ON_MS else 0
+
+
+def _toward(position, target):
+    if target < position - DEAD_ZONE:
+        return console.BUTTON_B  # Left
+    if target > position + DEAD_ZONE:
+        return console.BUTTON_Y  # Right
+    return 0
+
+
+def _steer(game, now):
+    """Buttons to hold for the game being played."""
+    name = game.__name__
+    if name == "breakout":
+        if game.game_state != "PLAYING":
+            return _pulse(now, console.BUTTON_A)
+        return _toward(game.paddle_x + game.PADDLE_WIDTH // 2, game.ball_x)
+    if name == "star_catcher":
+        if game.game_state != game.STATE_PLAYING:
+            return _pulse(now, console.BUTTON_A)
+        stars = game.stars
+        target = game.WIDTH // 2
+        lowest = -1
+        for k in range(stars.count):
+            i = stars.live[k]
+            if stars.y[i] > lowest:
+                lowest = stars.y[i]
+                target = stars.x[i]
+        return _toward(game.player_x + game.PLAYER_WIDTH // 2, target)
+    return _pulse(now, console.BUTTON_A)  # Unknown game: keep pressing A
+
+
+def _decide(now):
+    global _target, _launch_ms, _launch_failures, _game_name
+    game = console.active
+    if _phase == "menu":
+        main = sys.modules.get("main")
+        if main is None or game is not None:
+            return 0
+        if main.selected_index != _target:
+            return _pulse(now, console.BUTTON_Y)  # Down
+        _set_phase("launch", now)
+        return console.BUTTON_A
+    if _phase == "launch":
+        if game is not None:
+            _launch_ms = time.ticks_diff(now, _phase_ms)
+            _game_name = game.__name__
+            _set_phase("play", now)
+            return 0
+        if time.ticks_diff(now, _phase_ms) > LAUNCH_TIMEOUT_MS:
+            # Probably an error screen waiting for A: press it and try again
+            _launch_failures += 1
+            _set_phase("menu", now)
+            return console.BUTTON_A
+        return console.BUTTON_A if time.ticks_diff(now, _phase_ms) < PULSE_ON_MS else 0
+    if game is None:
+        # Back in the launcher after the double click (or the game failed)
+        _end_cycle(now)
+        _set_phase("menu", now)
+        return 0
+    if _phase == "play":
+        if time.ticks_diff(now, _phase_ms) < PLAY_MS:
+            return _steer(game, now)
+        _set_phase("exit", now)
+    # Exit: double click X, repeated until the launcher has left the game
+    t = time.ticks_diff(now, _phase_ms) % 2000
+    return console.BUTTON_X if t < PULSE_ON_MS or 2 * PULSE_ON_MS <= t < 3 * PULSE_ON_MS else 0
+
+
+def buttons(now):
+    """Mask of the buttons the autopilot holds down at ticks_ms now."""
+    global _mask, _mask_ms
+    if now != _mask_ms:  # Every pin is read in the same millisecond
+        _mask = _decide(now)
+        _mask_ms = now
+    return _mask
+
+
+# --- Measurements ---
+def largest_free_block(limit):
+    """Size of the largest bytearray that can be allocated now, to within 64
+    bytes. MicroPython has no direct query, so it is found by bisection."""
+    low, high = 0, limit
+    while high - low > 64:
+        middle = (low + high) // 2
+        try:
+            block = bytearray(middle)
+            del block
+            low = middle
+        except MemoryError:
+            high = middle
+    return low
+
+
+def _drop(ring, n):
+    """Bytes lost across the last n samples of ring, by least squares."""
+    sx = sy = sxy = sxx = 0
+    for k in range(n):
+        y = ring[(_samples - n + k) % TREND_WINDOW]
+        sx += k
+        sy += y
+        sxy += k * y
+        sxx += k * k
+    slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    return -slope * (n - 1)
+
+
+def _trend(free, largest):
+    """Records a post-warmup sample; returns the names of the falling figures."""
+    global _samples
+    if _cycle < WARMUP_CYCLES:
+        return ""
+    _free[_samples % TREND_WINDOW] = free
+    _largest[_samples % TREND_WINDOW] = largest
+    _samples += 1
+    if _samples < TREND_WINDOW:
+        return ""
+    falling = []
+    for name, ring in (("heap_free", _free), ("largest_block", _largest)):
+        drop = _drop(ring, TREND_WINDOW)
+        if drop > TREND_MIN_DROP:
+            falling.append(name)
+            print(f"Soak: {name} fell {int(drop)} B over the last {TREND_WINDOW} cycles")
+    return "+".join(falling)
+
+
+def _end_cycle(now):
+    global _cycle, _target
+    stats = console.session
+    gc.collect()
+    free = gc.mem_free()
+    largest = largest_free_block(free)
+    line = (
+        f"{_cycle},{time.ticks_diff(now, _start_ms) // 1000},{_game_name},{free},{largest},"
+        f"{stats.percentile(50)},{stats.percentile(95)},{stats.percentile(99)},"
+        f"{_launch_ms},{stats.frames},{_trend(free, largest)}"
+    )
+    print("Soak: " + line)
+    _log(line)
+    _cycle += 1
+    _target = _cycle % len(sys.modules["main"].games)
+    if CYCLES and _cycle >= CYCLES:
+        print(f"Soak: {_cycle} cycles done, {_launch_failures} failed launches")
+        raise SystemExit
+
+
+def _log(line):
+    # The file stays open for the whole run: opening it every cycle would
+    # show up in the heap figures being logged
+    global _log_file
+    try:
+        if _log_file is None:
+            _log_file = open(LOG_FILE, "a")
+            if _log_file.tell() == 0:
+                _log_file.write("cycle,seconds,game,heap_free,largest_block,p50_ms,p95_ms,p99_ms,launch_ms,frames,trend\n")
+        _log_file.write(line + "\n")
+        _log_file.flush()
+    except OSError as e:
+        print(f"Soak: cannot write {LOG_FILE}: {e}")
+
+
+# --- Button pins ---
+def install():
+    """Replaces machine.Pin so that the console's button GPIOs are read from
+    buttons(). Must run before main.py or console.py is imported."""
+    global console, _start_ms
+    import machine
+
+    real_pin = machine.Pin
+
+    class AutoPin:
+        def __new__(cls, id, *args, **kwargs):
+            if id not in _gpio_masks:
+                return real_pin(id, *args, **kwargs)  # Backlight, LED, ...
+            return object.__new__(cls)
+
+        def __init__(self, id, *args, **kwargs):
+            self.id = id
+            self._button = _gpio_masks[id]
+
+        def value(self, v=None):
+            if v is None:
+                return 0 if buttons(time.ticks_ms()) & self._button else 1
+
+        def init(self, *args, **kwargs):
+            pass
+
+        def irq(self, handler=None, trigger=None):
+            return None  # idle.py polls the pins between sleep slices as well
+
+    for name in ("IN", "OUT", "PULL_UP", "PULL_DOWN", "IRQ_FALLING", "IRQ_RISING"):
+        if hasattr(real_pin, name):
+            setattr(AutoPin, name, getattr(real_pin, name))
+    shim = type(sys)("machine")
+    for name in dir(machine):
+        if not name.startswith("__"):
+            setattr(shim, name, getattr(machine, name))
+    shim.Pin = AutoPin
+    sys.modules["machine"] = shim
+
+    import console as launcher
+
+    console = launcher
+    for mask, gpio in console.BUTTON_PINS:
+        _gpio_masks[gpio] = mask
+    _start_ms = time.ticks_ms()
+
+
+def _host_main():
+    global CYCLES, PLAY_MS, LOG_FILE
+    import argparse
+    import tracemalloc
+
+    import host_stubs
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=10, help="games to play, 0 for no limit")
+    parser.add_argument("--play-s", type=float, default=PLAY_MS / 1000, help="seconds in each game")
+    parser.add_argument("--log", default=LOG_FILE)
+    args = parser.parse_args()
+    CYCLES = args.cycles
+    PLAY_MS = int(args.play_s * 1000)
+    LOG_FILE = args.log
+    host_stubs.install()
+    # gc.mem_free() on the host is HEAP_SIZE minus the traced allocations.
+    # CPython objects are several times larger than MicroPython's, so give
+    # it room; on the host only the trend of the figures means anything.
+    host_stubs.HEAP_SIZE = 16 * 1024 * 1024
+    tracemalloc.start()
+    install()
+    import main  # noqa: F401  Runs the launcher until CYCLES are done
+
+
+if __name__ == "__main__":
+    if sys.implementation.name == "micropython":
+        install()
+        import main  # noqa: F401
+    else:
+        _host_main()
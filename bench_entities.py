@@ -0,0 +1,71 @@
+"""Heap cost per entity: the old per-object representations vs EntityStore.
+
+Runs on the Pico (`mpremote run bench_entities.py`) or on a computer
+(`python bench_entities.py`). Breakout used a dict per brick and Star Catcher
+a two-element list per star; both games now keep them in an EntityStore.
+"""
+import gc
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from entities import EntityStore
+
+COUNTS = (10, 100, 500)
+
+
+def _alloc_start():
+    gc.collect()
+    if tracemalloc is not None:
+        tracemalloc.start()
+        return 0
+    return gc.mem_alloc()
+
+
+def _alloc_end(start):
+    if tracemalloc is not None:
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return size
+    gc.collect()
+    return gc.mem_alloc() - start
+
+
+def brick_dicts(n):
+    return [
+        {"x": 1 + (i % 10) * 32, "y": 21 + (i // 10) * 12, "w": 30, "h": 10, "color": 0xFF0000 + i, "active": True}
+        for i in range(n)
+    ]
+
+
+def star_lists(n):
+    return [[40 + (i * 7) % 200, 300 + i] for i in range(n)]
+
+
+def store(n):
+    entities = EntityStore(n)
+    for i in range(n):
+        entities.spawn(1 + (i % 10) * 32, 21 + (i // 10) * 12, 30, 10, pen=0xFF0000 + i)
+    return entities
+
+
+def measure(build, n):
+    start = _alloc_start()
+    keep = build(n)
+    size = _alloc_end(start)
+    del keep
+    return size
+
+
+def main():
+    print(f"{'entities':>8} {'brick dicts':>12} {'star lists':>12} {'EntityStore':>12}   (bytes per entity)")
+    for n in COUNTS:
+        dicts = measure(brick_dicts, n)
+        lists = measure(star_lists, n)
+        columns = measure(store, n)
+        print(f"{n:>8} {dicts // n:>12} {lists // n:>12} {columns // n:>12}")
+
+
+main()
@@ -0,0 +1,329 @@
+"""Micro-benchmarks for the functions the games run every frame.
+
+Runs on CPython with the stubs in host_stubs.py:
+
+    python bench_hotpaths.py                   # compare against bench_baseline.json
+    python bench_hotpaths.py --update-baseline # record a new baseline
+    python bench_hotpaths.py -k star           # only benchmarks whose name contains "star"
+
+Each benchmark drives one hot-path function with a seeded workload at several
+sizes and reports calls per second, bytes allocated per call and the number
+of calls that reached the display. Speeds are
+stored relative to a fixed calibration loop, so a baseline recorded on one
+computer is usable on another. The run exits with status 1 if any benchmark
+is slower than the baseline by more than --threshold, allocates more, or
+makes more display calls. The stub display does no drawing, so draw speeds
+here measure only the Python side of rendering.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import host_stubs
+
+host_stubs.install()
+
+import breakout  # noqa: E402
+import console  # noqa: E402
+import star_catcher  # noqa: E402
+from entities import EntityStore  # noqa: E402
+from layers import GridLayer  # noqa: E402
+from level_stream import write_level  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+SIZES = (10, 100, 1000)
+SEED = 2024
+MIN_TIME_S = 0.05  # Per repeat
+REPEATS = 5  # Best of
+ALLOC_SLACK_BYTES = 64
+RETRIES = 2  # Re-measure an apparent slowdown this many times before failing
+
+display = host_stubs.Display()
+ctx = console.Context(display)
+level_dir = tempfile.TemporaryDirectory()
+
+
+def use_full_level(rows):
+    """Points breakout at a generated level with rows full rows."""
+    path = os.path.join(level_dir.name, f"full_{rows}.bin")
+    if not os.path.exists(path):
+        write_level(path, rows, host_stubs.WIDTH // (breakout.BRICK_WIDTH + 2), gaps=False)
+    if breakout.LEVEL_FILE != path and breakout.level is not None:
+        breakout.level.close()
+        breakout.level = None
+    breakout.LEVEL_FILE = path
+
+
+# --- Game setup helpers ---
+def setup_breakout(n_bricks, batched=breakout.BATCH_DRAWS):
+    """Starts a breakout game with n_bricks active bricks and the ball in open space."""
+    use_full_level(max(SIZES) // 10)
+    ctx.batch_draws(batched)
+    breakout.init(ctx)
+    cols = breakout.BRICK_COLS
+    breakout.BRICK_ROWS = -(-n_bricks // cols)
+    breakout.brick_layer = GridLayer(
+        ctx.gfx, 1, breakout.BRICK_TOP_OFFSET + 1,
+        breakout.BRICK_WIDTH, breakout.BRICK_HEIGHT,
+        breakout.BRICK_WIDTH + 2, breakout.BRICK_HEIGHT + 2,
+        cols, breakout.BRICK_ROWS, breakout.BACKGROUND_COLOR,
+    )
+    breakout.bricks = EntityStore(cols * breakout.BRICK_ROWS)
+    random.seed(SEED)
+    breakout.reset_game()
+    for i in range(n_bricks, breakout.bricks.capacity):
+        breakout.bricks.kill(i)
+        breakout.brick_layer.alive[i] = 0
+    breakout.game_state = "PLAYING"
+    # Below the bricks and above the paddle: every brick is tested, none hit
+    breakout.ball_x = breakout.WIDTH // 2
+    breakout.ball_y = breakout.HEIGHT - 40
+    breakout.ball_dx = 3
+    breakout.ball_dy = 0
+
+
+def make_stars(n, spread_y):
+    rng = random.Random(SEED)
+    return [
+        (rng.randint(star_catcher.min_spawn_x, star_catcher.max_spawn_x), rng.randint(spread_y[0], spread_y[1]))
+        for _ in range(n)
+    ]
+
+
+def load_stars(template):
+    stars = star_catcher.stars
+    stars.clear()
+    for x, y in template:
+        stars.spawn(x, y, star_catcher.STAR_SIZE, star_catcher.STAR_SIZE)
+
+
+def setup_star_catcher(n_stars, batched=star_catcher.BATCH_DRAWS):
+    ctx.batch_draws(batched)
+    star_catcher.init(ctx)
+    random.seed(SEED)
+    star_catcher.reset_game()
+    star_catcher.game_state = star_catcher.STATE_PLAYING
+    # Stars spread over the playfield, none touching the ship; room for one more
+    star_catcher.stars = EntityStore(n_stars + 1)
+    load_stars(make_stars(n_stars, (star_catcher.MIN_VERTICAL_START_SEPARATION, star_catcher.HEIGHT // 2)))
+    star_catcher.score = 12340
+    star_catcher.level = 7
+
+
+# --- Benchmarks: name -> (setup(size), per-call reset or None, function) ---
+def _star_reset(template):
+    def reset():
+        load_stars(template)
+        star_catcher.lives = star_catcher.MAX_LIVES
+    return reset
+
+
+def framed(draw):
+    """A draw function plus, for a batching game, the flush of its commands,
+    as the launcher runs it."""
+    def fn():
+        draw()
+        if ctx.batched:
+            ctx.gfx.end_frame()
+    return fn
+
+
+def benchmarks(size):
+    # The ball moves horizontally below the bricks, so no reset is needed
+    yield "breakout.move_ball", lambda: setup_breakout(size), None, breakout.move_ball
+    yield "breakout.check_collisions", lambda: setup_breakout(size), None, breakout.check_collisions
+    yield "breakout.draw_bricks", lambda: setup_breakout(size), None, framed(breakout.draw_bricks)
+    # The same draws through a DrawList, for games that set BATCH_DRAWS
+    yield "breakout.draw_bricks_batched", lambda: setup_breakout(size, True), None, framed(breakout.draw_bricks)
+
+    holder = {}
+
+    def star_setup(batched=star_catcher.BATCH_DRAWS):
+        setup_star_catcher(size, batched)
+        holder["template"] = make_stars(size, (star_catcher.MIN_VERTICAL_START_SEPARATION, star_catcher.HEIGHT // 2))
+        holder["reset"] = _star_reset(holder["template"])
+
+    def star_reset():
+        holder["reset"]()
+
+    yield "star_catcher.move_stars", star_setup, star_reset, star_catcher.move_stars
+    yield "star_catcher.add_star", star_setup, star_reset, star_catcher.add_star
+    yield "star_catcher.check_collisions", star_setup, star_reset, star_catcher.check_collisions
+    yield "star_catcher.draw_stars", star_setup, None, framed(star_catcher.draw_stars)
+    yield "star_catcher.draw_ui", star_setup, None, framed(star_catcher.draw_ui)
+    yield "star_catcher.draw_stars_batched", lambda: star_setup(True), None, framed(star_catcher.draw_stars)
+    yield "star_catcher.draw_ui_batched", lambda: star_setup(True), None, framed(star_catcher.draw_ui)
+
+
+# --- Measurement ---
+def calibrate():
+    """Calls per second of a fixed pure-Python loop, used to normalize speeds."""
+    def work():
+        total = 0
+        for i in range(200):
+            total += i * i
+        return total
+
+    return measure_speed(work, None)
+
+
+def measure_speed(fn, reset):
+    """Best-of-REPEATS calls per second. Functions without a reset run in batches."""
+    batch = 1 if reset is not None else 50
+    best = None
+    for _ in range(REPEATS):
+        calls = 0
+        elapsed = 0
+        while elapsed < MIN_TIME_S:
+            if reset is not None:
+                reset()
+            start = time.perf_counter()
+            for _ in range(batch):
+                fn()
+            elapsed += time.perf_counter() - start
+            calls += batch
+        rate = calls / elapsed
+        if best is None or rate > best:
+            best = rate
+    return best
+
+
+def measure_alloc(fn, reset, calls=20):
+    """Peak bytes allocated by one call, the largest over several calls."""
+    worst = 0
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            if reset is not None:
+                reset()
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            worst = max(worst, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def measure_calls(fn, reset):
+    """Display calls (primitives and pen changes) made by one call."""
+    if reset is not None:
+        reset()
+    before = display.calls
+    fn()
+    return display.calls - before
+
+
+def run(name_filter=None, keys=None, quiet=False):
+    """Runs the benchmarks; each is normalized by a calibration taken right before it."""
+    calibration = calibrate()
+    results = {}
+    for size in SIZES:
+        for name, setup, reset, fn in benchmarks(size):
+            key = f"{name}[{size}]"
+            if name_filter and name_filter not in key:
+                continue
+            if keys is not None and key not in keys:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):  # Games print on reset
+                setup()
+                local_calibration = calibrate()
+                speed = measure_speed(fn, reset)
+                setup()
+                alloc = measure_alloc(fn, reset)
+                setup()
+                calls = measure_calls(fn, reset)
+            results[key] = {
+                "ops_per_sec": round(speed),
+                "relative": speed / local_calibration,
+                "alloc_bytes": alloc,
+                "display_calls": calls,
+            }
+            if not quiet:
+                print(f"{key:<40} {speed:>12,.0f} ops/s {alloc:>8} B/call {calls:>6} display calls")
+    return calibration, results
+
+
+def slower(result, base, threshold):
+    return result["relative"] / base["relative"] - 1 < -threshold
+
+
+def compare(results, baseline, threshold):
+    # A slowdown is only reported if it shows up again on re-measurement;
+    # timings on a busy computer jitter by more than the threshold.
+    suspects = [k for k, r in results.items() if k in baseline and slower(r, baseline[k], threshold)]
+    for _ in range(RETRIES):
+        if not suspects:
+            break
+        _, again = run(keys=set(suspects), quiet=True)
+        for key, result in again.items():
+            if result["relative"] > results[key]["relative"]:
+                results[key] = result
+        suspects = [k for k in suspects if slower(results[k], baseline[k], threshold)]
+    failures = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"  new: {key}")
+            continue
+        if key in suspects:
+            change = result["relative"] / base["relative"] - 1
+            failures.append(f"{key}: {change:+.0%} speed")
+        if result["alloc_bytes"] > max(base["alloc_bytes"] * (1 + threshold), base["alloc_bytes"] + ALLOC_SLACK_BYTES):
+            failures.append(f"{key}: {base['alloc_bytes']} -> {result['alloc_bytes']} B/call")
+        if result["display_calls"] > base.get("display_calls", result["display_calls"]):
+            failures.append(f"{key}: {base['display_calls']} -> {result['display_calls']} display calls")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write results to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction (default 0.25)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("-k", dest="name_filter", help="only run benchmarks whose name contains this")
+    args = parser.parse_args(argv)
+
+    calibration, results = run(args.name_filter)
+    print(f"calibration: {calibration:,.0f} loops/s")
+
+    if args.update_baseline:
+        # Record the median of three runs so one lucky run does not set the bar
+        runs = [results, run(args.name_filter, quiet=True)[1], run(args.name_filter, quiet=True)[1]]
+        for key in results:
+            results[key] = sorted((r[key] for r in runs), key=lambda r: r["relative"])[1]
+        baseline = {}
+        if args.name_filter and os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)["results"]
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"calibration": round(calibration), "results": baseline}, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline; run with --update-baseline first")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    failures = compare(results, baseline, args.threshold)
+    if failures:
+        print("REGRESSIONS:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
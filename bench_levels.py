@@ -0,0 +1,108 @@
+"""Scrolling Breakout across level sizes: frame cost and RAM must stay flat.
+
+Runs on a computer with CPython (`python bench_levels.py`), using the stubs
+in host_stubs.py. For each level height a level file is generated, and
+Breakout is driven through SCROLLS scrolls. Every brick in the viewport's
+bottom row is removed between scrolls, as if the ball had hit it. The report
+shows the average and 95th percentile update+draw time per frame, the rows
+read from flash, the stream's chunk buffers, and the heap still held after
+playing. The heap includes the draw list and the open level file, so only
+its growth with level size matters.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import host_stubs
+
+host_stubs.install()
+
+import breakout  # noqa: E402
+import console  # noqa: E402
+from level_stream import write_level  # noqa: E402
+
+LEVEL_SIZES = (10, 100, 1000, 10000)
+SCROLLS = 200
+FRAMES_PER_SCROLL = 3
+
+
+class NoButtons:
+    def held(self, mask):
+        return False
+
+    def pressed(self, mask):
+        return False
+
+
+def clear_bottom_row():
+    cols = breakout.BRICK_COLS
+    for index in range((breakout.BRICK_ROWS - 1) * cols, breakout.BRICK_ROWS * cols):
+        if breakout.bricks.alive(index):
+            breakout.bricks.kill(index)
+            breakout.brick_layer.kill(index)
+
+
+def play(rows, path):
+    """Plays one level; returns per-frame update+draw times in microseconds."""
+    breakout.LEVEL_FILE = path
+    ctx = console.Context(host_stubs.Display())
+    ctx.batch_draws(breakout.BATCH_DRAWS)
+    buttons = NoButtons()
+    breakout.init(ctx)
+    breakout.reset_game()
+    breakout.game_state = "PLAYING"
+    breakout.pause_ms = 0
+    breakout.scrolls = 0
+    times = []
+    for _ in range(min(SCROLLS, rows)):
+        clear_bottom_row()
+        for _ in range(FRAMES_PER_SCROLL):
+            # Keep the ball moving sideways below the bricks
+            breakout.ball_x = breakout.WIDTH // 2
+            breakout.ball_y = breakout.HEIGHT - 40
+            breakout.ball_dx = 3
+            breakout.ball_dy = 0
+            start = time.perf_counter_ns()
+            breakout.update(breakout.FRAME_MS, buttons)
+            breakout.draw(ctx.gfx)
+            if ctx.batched:
+                ctx.gfx.end_frame()
+            times.append((time.perf_counter_ns() - start) // 1000)
+            if breakout.game_state != "PLAYING":
+                return times
+    return times
+
+
+def run(rows, directory):
+    path = os.path.join(directory, f"level_{rows}.bin")
+    write_level(path, rows, host_stubs.WIDTH // (breakout.BRICK_WIDTH + 2))
+    times = sorted(play(rows, path))
+    level = breakout.level
+    line = (
+        f"{rows:>7} rows  {breakout.scrolls:>4} scrolls  avg {sum(times) // len(times):>5} us  "
+        f"p95 {times[len(times) * 95 // 100]:>5} us  rows read {breakout.next_row:>4}  "
+        f"chunks {level.chunks_loaded:>3}  buffers {level.resident_bytes()} B"
+    )
+    breakout.suspend()
+    # Second, untimed pass for the heap kept by the level (tracing slows the first)
+    tracemalloc.start()
+    heap_start = tracemalloc.get_traced_memory()[0]
+    play(rows, path)
+    heap = tracemalloc.get_traced_memory()[0] - heap_start
+    tracemalloc.stop()
+    breakout.suspend()
+    print(f"{line}  heap {heap:>5} B")
+
+
+def main():
+    print(f"{SCROLLS} scrolls, {FRAMES_PER_SCROLL} frames each (update + draw)")
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in LEVEL_SIZES:
+            run(rows, directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
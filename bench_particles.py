@@ -0,0 +1,95 @@
+"""Worst-case burst benchmark for particles.ParticleSystem.
+
+Runs on the Pico (`mpremote run bench_particles.py`) or on a computer
+(`python bench_particles.py`). Drawing goes to a counting null display, so
+the numbers are the engine's own cost per frame.
+"""
+import gc
+import time
+
+if not hasattr(time, "ticks_us"):  # CPython host
+    import host_stubs
+
+    host_stubs.install()
+
+from particles import ParticleSystem
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+WIDTH = 320
+HEIGHT = 240
+FRAMES = 200
+
+
+class NullDisplay:
+    def __init__(self):
+        self.calls = 0
+
+    def set_pen(self, pen):
+        self.calls += 1
+
+    def rectangle(self, x, y, w, h):
+        self.calls += 1
+
+
+def _alloc_start():
+    if tracemalloc is not None:
+        tracemalloc.start()
+        return 0
+    gc.collect()
+    return gc.mem_alloc()
+
+
+def _alloc_end(start):
+    if tracemalloc is not None:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+    return gc.mem_alloc() - start
+
+
+def _drive(fx, display, bursts_per_frame, burst_size, every):
+    total_us = 0
+    max_us = 0
+    for frame in range(FRAMES):
+        if frame % every == 0:
+            for b in range(bursts_per_frame):
+                x = 16 + (frame * 37 + b * 61) % (WIDTH - 32)
+                y = 20 + (b * 12) % 60
+                fx.burst(x, y, b & 7, n=burst_size)
+        fx.step(display)
+        total_us += fx.last_step_us
+        if fx.last_step_us > max_us:
+            max_us = fx.last_step_us
+    return total_us, max_us
+
+
+def run(name, capacity, budget_us, bursts_per_frame, burst_size, every=1):
+    fx = ParticleSystem(WIDTH, HEIGHT, capacity=capacity, budget_us=budget_us)
+    display = NullDisplay()
+    total_us, max_us = _drive(fx, display, bursts_per_frame, burst_size, every)
+    # Second, untimed pass to count allocations (tracing slows the first)
+    probe = ParticleSystem(WIDTH, HEIGHT, capacity=capacity, budget_us=budget_us)
+    start = _alloc_start()
+    _drive(probe, NullDisplay(), bursts_per_frame, burst_size, every)
+    allocated = _alloc_end(start)
+    print(
+        f"{name:<22} avg={total_us // FRAMES:>5}us max={max_us:>5}us "
+        f"emitted={fx.emitted:>6} dropped={fx.dropped:>6} merged={fx.merged:>5} "
+        f"over_budget={fx.over_budget_frames:>3} alloc={allocated}B calls={display.calls}"
+    )
+
+
+def main():
+    print(f"{FRAMES} frames per scenario")
+    run("single brick", 96, 2000, 1, 12, every=10)
+    run("row cleared at once", 96, 2000, 10, 12)
+    run("pool saturated", 96, 2000, 20, 16)
+    run("tight budget", 96, 50, 20, 16)
+    run("large pool", 512, 2000, 40, 16)
+
+
+main()
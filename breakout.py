@@ -1,17 +1,16 @@
-import time
+import os
 import random
-from picographics import PicoGraphics, DISPLAY_PICO_DISPLAY_2
-from machine import Pin  # Use Pin directly
-
-# --- Display Setup ---
-display = PicoGraphics(display=DISPLAY_PICO_DISPLAY_2, rotate=0)
-WIDTH, HEIGHT = display.get_bounds()
-
-# --- Button Setup ---
-button_a = Pin(12, Pin.IN, Pin.PULL_UP)  # Start Game
-button_x = Pin(14, Pin.IN, Pin.PULL_UP)  # Exit Game (Double Click)
-button_b = Pin(13, Pin.IN, Pin.PULL_UP)  # Left
-button_y = Pin(15, Pin.IN, Pin.PULL_UP)  # Right
+import telemetry
+import leaderboard
+from console import BUTTON_A, BUTTON_B, BUTTON_Y
+from deadline import LEVEL_SKIP_HUD, LEVEL_FEWER_EFFECTS
+from particles import ParticleSystem
+from layers import GridLayer, DirtyRects
+from entities import EntityStore
+from level_stream import LevelStream, write_level
+
+FRAME_MS = 20  # Frame period the launcher paces this game at
+BATCH_DRAWS = False  # Draw straight to the display rather than through a DrawList
 
 # --- Game Constants ---
 PADDLE_WIDTH = 60
@@ -20,64 +19,154 @@ PADDLE_SPEED = 10
 BALL_RADIUS = 5
 BRICK_WIDTH = 30
 BRICK_HEIGHT = 10
-BRICK_ROWS = 5
-BRICK_COLS = WIDTH // (BRICK_WIDTH + 2)
+BRICK_ROWS = 5  # Rows in the viewport; the level itself can be any height
 BRICK_TOP_OFFSET = 20
-BRICK_COLORS = [
-    display.create_pen(255, 0, 0),  # Red
-    display.create_pen(255, 165, 0),  # Orange
-    display.create_pen(255, 255, 0),  # Yellow
-    display.create_pen(0, 255, 0),  # Green
-    display.create_pen(0, 0, 255),  # Blue
-]
-BACKGROUND_COLOR = display.create_pen(0, 0, 0)
-PADDLE_COLOR = display.create_pen(200, 200, 200)
-BALL_COLOR = display.create_pen(255, 255, 255)
-SCORE_COLOR = display.create_pen(255, 255, 255)
-TEXT_COLOR = display.create_pen(255, 255, 255)
+HUD_HEIGHT = BRICK_TOP_OFFSET + 1
+FIELD_BOTTOM = BRICK_TOP_OFFSET + 1 + BRICK_ROWS * (BRICK_HEIGHT + 2)
+
+# --- Level ---
+# Levels are many screens tall and live in a file on flash (see
+# level_stream.py). The viewport shows BRICK_ROWS rows; when its bottom row
+# is cleared the bricks move down one row and the next level row is read in
+# at the top. Only the viewport's bricks are in RAM, drawn or collision tested.
+LEVEL_FILE = "breakout_level.bin"
+LEVEL_ROWS = 60  # Height of the level generated when LEVEL_FILE is missing
+LEVEL_CHUNK_ROWS = 8  # Rows read from flash at a time
+PREFETCH_ROWS = 3  # Load the next chunk this many rows before it is needed
+SERVE_DELAY_MS = 500  # Ball waits this long after a reset or a lost life
+RESULT_SCREEN_MS = 3000  # How long GAME OVER / DU VANN! stays up
+
+# --- Display Setup (done in init) ---
+display = None
+WIDTH = 0
+HEIGHT = 0
+BRICK_COLS = 0
+BRICK_COLORS = []
+BACKGROUND_COLOR = 0
+PADDLE_COLOR = 0
+BALL_COLOR = 0
+SCORE_COLOR = 0
+TEXT_COLOR = 0
+
+# --- Effects and Layers (allocated on first init, kept while loaded) ---
+# The brick field is painted into the framebuffer once and then only patched:
+# each frame erases the rectangles the moving sprites covered last frame and
+# repaints the bricks under them (see layers.py).
+sparks = None
+brick_layer = None
+bricks = None  # EntityStore; slot i is cell i of brick_layer
+level = None  # LevelStream, open while the game is running
+row_buf = None  # One level row, reused for every row read
+sprite_rects = DirtyRects()
 
 # --- Game Variables ---
-paddle_x = (WIDTH - PADDLE_WIDTH) // 2
-paddle_y = HEIGHT - PADDLE_HEIGHT - 5
+paddle_x = 0
+paddle_y = 0
 
-ball_x = WIDTH // 2
-ball_y = HEIGHT // 2
+ball_x = 0
+ball_y = 0
 ball_dx = 0
 ball_dy = 0
 
-bricks = []
 score = 0
 lives = 10
 
 # Game States: START, PLAYING, GAME_OVER, WIN
 game_state = "START"
-
-# --- Double Click Exit Logic Variables ---
-last_x_press_time = 0
-x_click_state = "IDLE"  # States: IDLE, FIRST_PRESS, WAITING_FOR_SECOND
-DOUBLE_CLICK_INTERVAL_MS = 300  # Milliseconds for double click detection
+ctx = None
+pause_ms = 0  # Ball is held while > 0
+result_ms = 0  # Time left on the GAME_OVER / WIN screen
+result_rank = 0  # Leaderboard position of the last finished game (0 = outside)
+screen_drawn = False  # Whether the current state's full screen is on display
+next_row = 0  # Level row that enters the viewport at the next scroll
+field_dirty = False  # The viewport scrolled; the brick field must be repainted
+scrolls = 0
+# Score and lives on screen; while degraded the HUD is only redrawn when they
+# change or a sprite drawn over it last frame has just been erased
+hud_score = -1
+hud_lives = -1
+hud_damaged = False
 
 
 # --- Helper Functions ---
-def create_bricks():
-    """Creates the grid of bricks."""
-    global bricks
-    bricks = []
+def open_level():
+    """Opens LEVEL_FILE, generating a default level on first use."""
+    try:
+        os.stat(LEVEL_FILE)
+    except OSError:
+        print(f"Creating {LEVEL_FILE} ({LEVEL_ROWS} rows)")
+        write_level(LEVEL_FILE, LEVEL_ROWS, BRICK_COLS, colors=len(BRICK_COLORS))
+    return LevelStream(LEVEL_FILE, chunk_rows=LEVEL_CHUNK_ROWS)
+
+
+def load_row(view_row):
+    """Reads the next level row into viewport row view_row of the brick layer."""
+    global next_row
+    level.read_row(next_row, row_buf)
+    next_row += 1
+    index = view_row * BRICK_COLS
+    for c in range(BRICK_COLS):
+        code = row_buf[c]
+        if code:
+            brick_layer.set_cell(index + c, BRICK_COLORS[(code - 1) % len(BRICK_COLORS)])
+        else:
+            brick_layer.alive[index + c] = 0
+    level.prefetch(next_row + PREFETCH_ROWS)
+    level.release_below(next_row)
+
+
+def sync_bricks():
+    """Rebuilds the brick entities from the brick layer's cells."""
+    bricks.clear()
+    alive = brick_layer.alive
+    pens = brick_layer.pens
+    # A cleared store hands out slots in order, matching the layer's cells
     for r in range(BRICK_ROWS):
         for c in range(BRICK_COLS):
-            brick_x = c * (BRICK_WIDTH + 2) + 1
-            brick_y = r * (BRICK_HEIGHT + 2) + BRICK_TOP_OFFSET + 1
-            color_index = r % len(BRICK_COLORS)
-            bricks.append(
-                {
-                    "x": brick_x,
-                    "y": brick_y,
-                    "w": BRICK_WIDTH,
-                    "h": BRICK_HEIGHT,
-                    "color": BRICK_COLORS[color_index],
-                    "active": True,
-                }
+            index = r * BRICK_COLS + c
+            bricks.spawn(
+                c * (BRICK_WIDTH + 2) + 1,
+                r * (BRICK_HEIGHT + 2) + BRICK_TOP_OFFSET + 1,
+                BRICK_WIDTH,
+                BRICK_HEIGHT,
+                pen=pens[index],
             )
+    for index in range(BRICK_ROWS * BRICK_COLS):
+        if not alive[index]:
+            bricks.kill(index)
+
+
+def create_bricks():
+    """Fills the viewport with the first rows of the level (row 0 at the bottom)."""
+    global next_row
+    brick_layer.clear_cells()
+    level.reset()
+    next_row = 0
+    for view_row in range(BRICK_ROWS - 1, -1, -1):
+        load_row(view_row)
+    sync_bricks()
+
+
+def bottom_row_cleared():
+    alive = brick_layer.alive
+    for index in range((BRICK_ROWS - 1) * BRICK_COLS, BRICK_ROWS * BRICK_COLS):
+        if alive[index]:
+            return False
+    return True
+
+
+def scroll_level():
+    """Moves the bricks down one row and reads the next level row in at the top."""
+    global field_dirty, scrolls
+    brick_layer.shift_down()
+    load_row(0)
+    sync_bricks()
+    field_dirty = True
+    scrolls += 1
+
+
+def level_cleared():
+    return bricks.count == 0 and next_row >= level.rows
 
 
 def draw_paddle():
@@ -93,11 +182,33 @@ def draw_ball():
 
 
 def draw_bricks():
-    """Draws the active bricks."""
-    for brick in bricks:
-        if brick["active"]:
-            display.set_pen(brick["color"])
-            display.rectangle(brick["x"], brick["y"], brick["w"], brick["h"])
+    """Paints all active bricks into the brick layer (full redraw)."""
+    brick_layer.redraw()
+
+
+def draw_sprites():
+    """Draws everything that moves over the brick layer and records its area."""
+    global hud_score, hud_lives, hud_damaged
+    if (ctx.degrade_level < LEVEL_SKIP_HUD or hud_damaged
+            or score != hud_score or lives != hud_lives):
+        display.set_pen(BACKGROUND_COLOR)
+        display.rectangle(0, 0, WIDTH, HUD_HEIGHT)
+        draw_score_lives()
+        if ctx.batched:
+            display.barrier()  # Sprites passing the HUD stay on top of it
+        hud_score = score
+        hud_lives = lives
+    draw_paddle()
+    sprite_rects.add(paddle_x, paddle_y, PADDLE_WIDTH, PADDLE_HEIGHT)
+    draw_ball()
+    sprite_rects.add(
+        int(ball_x) - BALL_RADIUS, int(ball_y) - BALL_RADIUS, 2 * BALL_RADIUS + 1, 2 * BALL_RADIUS + 1
+    )
+    sparks.step(display)
+    b = sparks.bounds
+    sprite_rects.add(b[0], b[1], b[2] - b[0], b[3] - b[1])
+    # Their erase next frame will cut into the HUD
+    hud_damaged = int(ball_y) - BALL_RADIUS < HUD_HEIGHT or (b[2] > b[0] and b[1] < HUD_HEIGHT)
 
 
 def draw_score_lives():
@@ -107,14 +218,14 @@ def draw_score_lives():
     display.text(f"Liv: {lives}", WIDTH - 90, 5, scale=2)
 
 
-def move_paddle():
+def move_paddle(buttons):
     """Moves the paddle based on button input."""
     global paddle_x
-    if button_b.value() == 0:  # Move left
+    if buttons.held(BUTTON_B):  # Move left
         paddle_x -= PADDLE_SPEED
         if paddle_x < 0:
             paddle_x = 0
-    if button_y.value() == 0:  # Move right
+    if buttons.held(BUTTON_Y):  # Move right
         paddle_x += PADDLE_SPEED
         if paddle_x > WIDTH - PADDLE_WIDTH:
             paddle_x = WIDTH - PADDLE_WIDTH
@@ -122,7 +233,7 @@ def move_paddle():
 
 def move_ball():
     """Moves the ball and handles wall collisions."""
-    global ball_x, ball_y, ball_dx, ball_dy, lives, game_state
+    global ball_x, ball_y, ball_dx, ball_dy, lives, game_state, pause_ms
 
     ball_x += ball_dx
     ball_y += ball_dy
@@ -138,16 +249,18 @@ def move_ball():
     # Bottom wall collision (lose life)
     if ball_y + BALL_RADIUS > HEIGHT:
         lives -= 1
+        telemetry.record(telemetry.EV_LIFE_LOST, score=score, value=lives)
         if lives > 0:
             # Reset ball position and speed
             ball_x = WIDTH // 2
             ball_y = HEIGHT // 2
             ball_dx = random.choice([-6, 6])
             ball_dy = -6
-            time.sleep(0.5)  # Shorter pause
+            pause_ms = SERVE_DELAY_MS  # Short pause before the ball moves
         else:
             # Game Over
             game_state = "GAME_OVER"
+            telemetry.record(telemetry.EV_GAME_OVER, score=score)
 
 
 def check_collisions():
@@ -167,52 +280,63 @@ def check_collisions():
         ball_dx = hit_pos * 6
 
     # Brick collisions
-    for brick in bricks:
-        if brick["active"]:
-            # Check if ball's bounding box intersects brick's bounding box
-            if (
-                brick["x"] < ball_x + BALL_RADIUS
-                and brick["x"] + brick["w"] > ball_x - BALL_RADIUS
-                and brick["y"] < ball_y + BALL_RADIUS
-                and brick["y"] + brick["h"] > ball_y - BALL_RADIUS
-            ):
-
-                brick["active"] = False
-                score += 10
-
-                # Determine collision side to reverse correct direction
-                overlap_x = min(
-                    ball_x + BALL_RADIUS - brick["x"],
-                    brick["x"] + brick["w"] - (ball_x - BALL_RADIUS),
-                )
-                overlap_y = min(
-                    ball_y + BALL_RADIUS - brick["y"],
-                    brick["y"] + brick["h"] - (ball_y - BALL_RADIUS),
-                )
-
-                # Reverse direction based on smaller overlap
-                if overlap_x < overlap_y:
-                    ball_dx *= -1
-                    # Nudge ball out horizontally
-                    if ball_x < brick["x"] + brick["w"] / 2:
-                        ball_x = brick["x"] - BALL_RADIUS
-                    else:
-                        ball_x = brick["x"] + brick["w"] + BALL_RADIUS
+    bx = bricks.x
+    by = bricks.y
+    bw = bricks.w
+    bh = bricks.h
+    live = bricks.live
+    for k in range(bricks.count - 1, -1, -1):  # Backwards: kill() moves the last live brick into k
+        index = live[k]
+        brick_x = bx[index]
+        brick_y = by[index]
+        brick_w = bw[index]
+        brick_h = bh[index]
+        # Check if ball's bounding box intersects brick's bounding box
+        if (
+            brick_x < ball_x + BALL_RADIUS
+            and brick_x + brick_w > ball_x - BALL_RADIUS
+            and brick_y < ball_y + BALL_RADIUS
+            and brick_y + brick_h > ball_y - BALL_RADIUS
+        ):
+
+            bricks.kill(index)
+            brick_layer.kill(index)
+            score += 10
+            sparks.burst(brick_x + brick_w // 2, brick_y + brick_h // 2, bricks.pen[index])
+
+            # Determine collision side to reverse correct direction
+            overlap_x = min(
+                ball_x + BALL_RADIUS - brick_x,
+                brick_x + brick_w - (ball_x - BALL_RADIUS),
+            )
+            overlap_y = min(
+                ball_y + BALL_RADIUS - brick_y,
+                brick_y + brick_h - (ball_y - BALL_RADIUS),
+            )
+
+            # Reverse direction based on smaller overlap
+            if overlap_x < overlap_y:
+                ball_dx *= -1
+                # Nudge ball out horizontally
+                if ball_x < brick_x + brick_w / 2:
+                    ball_x = brick_x - BALL_RADIUS
+                else:
+                    ball_x = brick_x + brick_w + BALL_RADIUS
+            else:
+                ball_dy *= -1
+                # Nudge ball out vertically
+                if ball_y < brick_y + brick_h / 2:
+                    ball_y = brick_y - BALL_RADIUS
                 else:
-                    ball_dy *= -1
-                    # Nudge ball out vertically
-                    if ball_y < brick["y"] + brick["h"] / 2:
-                        ball_y = brick["y"] - BALL_RADIUS
-                    else:
-                        ball_y = brick["y"] + brick["h"] + BALL_RADIUS
+                    ball_y = brick_y + brick_h + BALL_RADIUS
 
-                break  # Only handle one brick collision per frame
+            break  # Only handle one brick collision per frame
 
     # Check for win condition
-    active_bricks = sum(1 for brick in bricks if brick["active"])
-    if active_bricks == 0:
+    if level_cleared():
         global game_state
         game_state = "WIN"
+        telemetry.record(telemetry.EV_WIN, score=score, value=lives)
 
 
 def start_screen():
@@ -223,7 +347,11 @@ def start_screen():
     # Adjust x-coordinates for left alignment
     display.text("TA BORT KLOSSAR", 10, HEIGHT // 2 - 40, scale=3)
     display.text("Tryck A för att Starta", 10, HEIGHT // 2 + 10, scale=2)
-    display.update()
+
+
+def draw_rank():
+    if leaderboard.enabled():
+        display.text(leaderboard.rank_text(telemetry.GAME_BREAKOUT, result_rank), 10, HEIGHT // 2 + 50, scale=2)
 
 
 def game_over_screen():
@@ -232,8 +360,7 @@ def game_over_screen():
     display.set_pen(TEXT_COLOR)
     display.text("GAME OVER", WIDTH // 2 - 80, HEIGHT // 2 - 20, scale=3)
     display.text(f"Poäng: {score}", WIDTH // 2 - 70, HEIGHT // 2 + 20, scale=2)
-    display.update()
-    time.sleep(3)  # Shorter wait
+    draw_rank()
 
 
 def win_screen():
@@ -242,137 +369,166 @@ def win_screen():
     display.set_pen(TEXT_COLOR)
     display.text("DU VANN!", WIDTH // 2 - 60, HEIGHT // 2 - 20, scale=3)
     display.text(f"Poäng: {score}", WIDTH // 2 - 70, HEIGHT // 2 + 20, scale=2)
-    display.update()
-    time.sleep(3)  # Shorter wait
+    draw_rank()
 
 
 def reset_game():
     """Resets game variables for a new game."""
-    global score, lives, paddle_x, ball_x, ball_y, ball_dx, ball_dy, bricks
+    global score, lives, paddle_x, ball_x, ball_y, ball_dx, ball_dy
+    global pause_ms, screen_drawn
     score = 0
     lives = 10
     create_bricks()
     paddle_x = (WIDTH - PADDLE_WIDTH) // 2
     ball_x = WIDTH // 2
     ball_y = HEIGHT // 2
-    # Give a slight delay before ball moves
-    ball_dx = 0
-    ball_dy = 0
-    # Draw initial state before ball moves
-    display.set_pen(BACKGROUND_COLOR)
-    display.clear()
-    draw_paddle()
-    draw_ball()
-    draw_bricks()
-    draw_score_lives()
-    display.update()
-    time.sleep(0.5)
-    # Now set the ball speed
     ball_dx = random.choice([-6, 6])
     ball_dy = -6
-
-
-# --- Main Game Loop ---
-while True:
-    current_time_ms = time.ticks_ms()
-    x_pressed = button_x.value() == 0
-
-    # --- Double Click Exit Check ---
-    if game_state != "START":  # Only allow exit during play/game over/win states
-        if x_click_state == "IDLE":
-            if x_pressed:
-                x_click_state = "FIRST_PRESS"
-                last_x_press_time = current_time_ms
-
-        elif x_click_state == "FIRST_PRESS":
-            if not x_pressed:  # Released after first press
-                if (
-                    time.ticks_diff(current_time_ms, last_x_press_time)
-                    < DOUBLE_CLICK_INTERVAL_MS
-                ):
-                    x_click_state = "WAITING_FOR_SECOND"
-                else:  # Released too late, reset
-                    x_click_state = "IDLE"
-            elif (
-                time.ticks_diff(current_time_ms, last_x_press_time)
-                >= DOUBLE_CLICK_INTERVAL_MS
-            ):
-                # Held too long, reset
-                x_click_state = "IDLE"
-
-        elif x_click_state == "WAITING_FOR_SECOND":
-            # Check 1: Has the button been pressed again?
-            if x_pressed:
-                # Check 1a: Was this second press within the double-click interval from the *start* of the first press?
-                if (
-                    time.ticks_diff(current_time_ms, last_x_press_time)
-                    < DOUBLE_CLICK_INTERVAL_MS
-                ):
-                    # Double click successful!
-                    print("X Double Click: Exiting game!")
-                    break  # Exit the main while loop
-                else:
-                    # Second press occurred, but too late for a double click.
-                    # Treat this press as a *new* first press.
-                    x_click_state = "FIRST_PRESS"
-                    last_x_press_time = current_time_ms  # Record time of this new press
-            # Check 2: If the button was *not* pressed, has too much time elapsed since the first press started?
-            elif (
-                time.ticks_diff(current_time_ms, last_x_press_time)
-                >= DOUBLE_CLICK_INTERVAL_MS
-            ):
-                # Timeout waiting for the second press. Reset state.
-                x_click_state = "IDLE"
-            # else: Button not pressed, but still within the double-click window. Do nothing, keep waiting.
-
-    # Reset exit state if game goes back to START screen
-    if game_state == "START" and x_click_state != "IDLE":
-        x_click_state = "IDLE"
-
-    # --- Game State Logic ---
+    # Give a slight delay before ball moves
+    pause_ms = SERVE_DELAY_MS
+    sparks.clear()
+    screen_drawn = False  # First frame clears and paints the brick layer
+
+
+# --- Game Lifecycle (driven by the launcher, see console.py) ---
+def init(context):
+    """Sets up display resources on first launch and shows the start screen."""
+    global ctx, display, WIDTH, HEIGHT, BRICK_COLS, BRICK_COLORS, BACKGROUND_COLOR
+    global PADDLE_COLOR, BALL_COLOR, SCORE_COLOR, TEXT_COLOR, sparks, brick_layer, bricks
+    global paddle_y, game_state, screen_drawn, level, row_buf
+    ctx = context
+    display = context.gfx  # The display, or a DrawList flushed by the launcher
+    if brick_layer is None:
+        WIDTH, HEIGHT = context.width, context.height
+        BRICK_COLS = WIDTH // (BRICK_WIDTH + 2)
+        BRICK_COLORS = [
+            display.create_pen(255, 0, 0),  # Red
+            display.create_pen(255, 165, 0),  # Orange
+            display.create_pen(255, 255, 0),  # Yellow
+            display.create_pen(0, 255, 0),  # Green
+            display.create_pen(0, 0, 255),  # Blue
+        ]
+        BACKGROUND_COLOR = display.create_pen(0, 0, 0)
+        PADDLE_COLOR = display.create_pen(200, 200, 200)
+        BALL_COLOR = display.create_pen(255, 255, 255)
+        SCORE_COLOR = display.create_pen(255, 255, 255)
+        TEXT_COLOR = display.create_pen(255, 255, 255)
+        sparks = ParticleSystem(WIDTH, HEIGHT, capacity=96, budget_us=2000)
+        brick_layer = GridLayer(
+            display,
+            1,
+            BRICK_TOP_OFFSET + 1,
+            BRICK_WIDTH,
+            BRICK_HEIGHT,
+            BRICK_WIDTH + 2,
+            BRICK_HEIGHT + 2,
+            BRICK_COLS,
+            BRICK_ROWS,
+            BACKGROUND_COLOR,
+        )
+        bricks = EntityStore(BRICK_COLS * BRICK_ROWS)
+        row_buf = bytearray(BRICK_COLS)
+    if level is None:
+        level = open_level()
+    paddle_y = HEIGHT - PADDLE_HEIGHT - 5
+    game_state = "START"
+    screen_drawn = False
+
+
+def update(dt, buttons):
+    """Advances the game by one frame."""
+    global game_state, pause_ms, result_ms, result_rank, screen_drawn
+    ctx.static = game_state == "START"
     if game_state == "START":
-        start_screen()
-        if button_a.value() == 0:
+        if buttons.pressed(BUTTON_A):
             reset_game()
             game_state = "PLAYING"
+            ctx.static = False
 
     elif game_state == "PLAYING":
+        sparks.limit(2 if ctx.degrade_level >= LEVEL_FEWER_EFFECTS else 0)
         # --- Input ---
-        move_paddle()
+        move_paddle(buttons)
 
         # --- Logic ---
+        if pause_ms > 0:
+            pause_ms -= dt
+            return
         move_ball()
         if game_state == "PLAYING":  # Check if move_ball changed the state
             check_collisions()
-
-        # --- Drawing ---
-        display.set_pen(BACKGROUND_COLOR)
-        display.clear()
-        draw_paddle()
-        draw_ball()
-        draw_bricks()
-        draw_score_lives()
-
-        # --- Update Display ---
-        display.update()
-
-    elif game_state == "GAME_OVER":
-        game_over_screen()
-        game_state = "START"  # Go back to start screen
-
-    elif game_state == "WIN":
-        win_screen()
-        game_state = "START"  # Go back to start screen
-
-    # --- Frame Limiter ---
+        if (
+            game_state == "PLAYING"
+            and ball_y - BALL_RADIUS > FIELD_BOTTOM  # Bricks never move onto the ball
+            and bottom_row_cleared()
+        ):
+            scroll_level()
+        if game_state != "PLAYING":
+            result_ms = RESULT_SCREEN_MS
+            # Queued for upload in the background; the rank comes from the cache
+            result_rank = leaderboard.submit(telemetry.GAME_BREAKOUT, score)
+            screen_drawn = False
+
+    else:  # GAME_OVER or WIN
+        result_ms -= dt
+        if result_ms <= 0:
+            game_state = "START"  # Go back to start screen
+            screen_drawn = False
+
+
+def draw(gfx):
+    """Renders the current state into gfx (the display set up in init).
+
+    Only the changed areas are redrawn while playing.
+    """
+    global screen_drawn, hud_score, field_dirty
     if game_state == "PLAYING":
-        time.sleep(0.01)
-    else:
-        time.sleep(0.05)
-
-# --- End of Game Loop ---
-print("Breakout game loop finished.")
-# Cleanup if needed
-display.set_pen(BACKGROUND_COLOR)
-display.clear()
-display.update()
+        if not screen_drawn:
+            # Draw initial state: clear and paint the brick layer once
+            display.set_pen(BACKGROUND_COLOR)
+            display.clear()
+            sprite_rects.reset()
+            draw_bricks()
+            if ctx.batched:
+                display.barrier()  # Sprites and the HUD go over the bricks
+            hud_score = -1
+            screen_drawn = True
+        else:
+            # Erase last frame's sprites, patch the bricks under them
+            sprite_rects.restore(display, BACKGROUND_COLOR, brick_layer)
+            if field_dirty:
+                # Scrolled: repaint the viewport (its cost does not grow with the level)
+                display.set_pen(BACKGROUND_COLOR)
+                display.rectangle(0, HUD_HEIGHT, WIDTH, FIELD_BOTTOM - HUD_HEIGHT)
+                draw_bricks()
+                if ctx.batched:
+                    display.barrier()
+        field_dirty = False
+        draw_sprites()
+    elif not screen_drawn:
+        if game_state == "START":
+            start_screen()
+        elif game_state == "GAME_OVER":
+            game_over_screen()
+        else:
+            win_screen()
+        screen_drawn = True
+
+
+def suspend():
+    """Player left for the menu; the next launch starts from the title."""
+    global game_state, level
+    sparks.clear()
+    game_state = "START"
+    if level is not None:
+        level.close()
+        level = None
+
+
+def shutdown():
+    """Releases the buffers allocated in init before the module is unloaded."""
+    global sparks, brick_layer, bricks, row_buf
+    sparks = None
+    brick_layer = None
+    bricks = None
+    row_buf = None
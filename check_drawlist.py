@@ -0,0 +1,147 @@
+"""Checks that batching draws through a DrawList (drawlist.py) leaves the
+same picture as drawing straight to the display.
+
+Runs on a computer with the stubs in host_stubs.py:
+
+    python check_drawlist.py
+
+Plays each game with seeded input, once drawing directly and once through a
+DrawList, on a display that keeps a coarse framebuffer: every primitive
+fills its bounding box with its pen. A frame whose pixels differ means the
+pen grouping moved a primitive under one it was drawn over, and a barrier is
+missing. Exits non-zero if any check fails.
+"""
+import contextlib
+import io
+import random
+import sys
+
+import host_stubs
+
+host_stubs.install()
+
+import breakout  # noqa: E402
+import console  # noqa: E402
+import star_catcher  # noqa: E402
+
+SEEDS = 4
+FRAMES = 150
+WIDTH, HEIGHT = host_stubs.WIDTH, host_stubs.HEIGHT
+
+
+class Framebuffer(host_stubs.Display):
+    """Stub display that also records the last pen written to each pixel."""
+
+    def __init__(self):
+        super().__init__()
+        self.pixels = {}
+        self.current = 0
+
+    def set_pen(self, pen):
+        super().set_pen(pen)
+        self.current = pen
+
+    def clear(self):
+        super().clear()
+        self.pixels = {}
+
+    def _fill(self, x0, y0, x1, y1):
+        pen = self.current
+        pixels = self.pixels
+        for y in range(max(0, y0), min(HEIGHT, y1)):
+            for x in range(max(0, x0), min(WIDTH, x1)):
+                pixels[(x, y)] = pen
+
+    def rectangle(self, x, y, w, h):
+        super().rectangle(x, y, w, h)
+        self._fill(x, y, x + w, y + h)
+
+    def circle(self, x, y, r):
+        super().circle(x, y, r)
+        self._fill(x - r, y - r, x + r + 1, y + r + 1)
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        super().triangle(x1, y1, x2, y2, x3, y3)
+        self._fill(min(x1, x2, x3), min(y1, y2, y3), max(x1, x2, x3) + 1, max(y1, y2, y3) + 1)
+
+    def text(self, text, x, y, wordwrap=None, scale=1):
+        super().text(text, x, y, wordwrap, scale)
+        self._fill(x, y, x + self.measure_text(text, scale=scale), y + 8 * scale)
+
+    def pixel(self, x, y):
+        super().pixel(x, y)
+        self._fill(x, y, x + 1, y + 1)
+
+    def line(self, x1, y1, x2, y2):
+        super().line(x1, y1, x2, y2)
+        self._fill(min(x1, x2), min(y1, y2), max(x1, x2) + 1, max(y1, y2) + 1)
+
+
+class RandomButtons:
+    """Holds and presses buttons at random, from the global random state."""
+
+    def held(self, mask):
+        return random.random() < 0.3
+
+    def pressed(self, mask):
+        return random.random() < 0.05
+
+
+def play(game, playing_state, batched, seed):
+    """Plays FRAMES frames; returns the framebuffer after each."""
+    display = Framebuffer()
+    ctx = console.Context(display)
+    ctx.batch_draws(batched)
+    game.shutdown()  # Rebuild the layers and pools on this display
+    random.seed(seed)
+    game.init(ctx)
+    game.reset_game()
+    game.game_state = playing_state
+    buttons = RandomButtons()
+    frames = []
+    for frame in range(FRAMES):
+        ctx.degrade_level = (frame // 40) % 2  # Alternate full and skipped-HUD rendering
+        random.seed(seed * 1000 + frame)  # Same input and spawns on both paths
+        game.update(game.FRAME_MS, buttons)
+        game.draw(ctx.gfx)
+        if batched:
+            ctx.gfx.end_frame()
+        frames.append(dict(display.pixels))
+    game.suspend()
+    return frames
+
+
+def check_game(expect, name, game, playing_state):
+    problems = []
+    with contextlib.redirect_stdout(io.StringIO()):  # Games print on reset
+        for seed in range(SEEDS):
+            direct = play(game, playing_state, False, seed)
+            batched = play(game, playing_state, True, seed)
+            for frame, (a, b) in enumerate(zip(direct, batched)):
+                if a != b:
+                    diff = sorted(k for k in set(a) | set(b) if a.get(k) != b.get(k))
+                    problems.append(f"seed {seed} frame {frame}: {len(diff)} pixels differ, first at {diff[0]}")
+    expect(
+        name,
+        not problems,
+        problems[0] if problems else f"{SEEDS * FRAMES} frames drawn the same directly and batched",
+    )
+
+
+def main():
+    failed = []
+
+    def expect(name, ok, detail):
+        print(f"{name:<8} {'ok  ' if ok else 'FAIL'} {detail}")
+        if not ok:
+            failed.append(name)
+
+    check_game(expect, "stars", star_catcher, star_catcher.STATE_PLAYING)
+    check_game(expect, "breakout", breakout, "PLAYING")
+    if breakout.level is not None:
+        breakout.level.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Checks for EntityStore (entities.py) and the games' loops over it.
+
+Runs on a computer with the stubs in host_stubs.py:
+
+    python check_entities.py
+
+Covers spawning, killing and clearing, the order the free list hands slots
+back out, a full store, killing a slot twice, and the swap-remove in kill()
+while a loop walks live backwards, both on its own and inside
+breakout.check_collisions. Exits non-zero if any check fails.
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+
+import host_stubs
+
+host_stubs.install()
+
+import breakout  # noqa: E402
+import console  # noqa: E402
+from entities import FLAG_ALIVE, FLAG_USER, EntityStore  # noqa: E402
+from level_stream import write_level  # noqa: E402
+
+SEED = 2024
+
+
+def consistency(store):
+    """Empty if live, _where, the flags and the free list agree; else the first problem."""
+    live = [store.live[k] for k in range(store.count)]
+    free = [store._free[k] for k in range(store._free_count)]
+    if len(set(live)) != len(live):
+        return f"live has duplicates: {live}"
+    if store.count + store._free_count != store.capacity:
+        return f"{store.count} live + {store._free_count} free != capacity {store.capacity}"
+    if set(live) | set(free) != set(range(store.capacity)):
+        return f"slots lost: live {sorted(live)}, free {sorted(free)}"
+    for k, i in enumerate(live):
+        if store._where[i] != k:
+            return f"_where[{i}] is {store._where[i]}, live position {k}"
+        if not store.alive(i):
+            return f"slot {i} is in live but not alive"
+    for i in free:
+        if store.flags[i]:
+            return f"free slot {i} has flags {store.flags[i]}"
+    return ""
+
+
+def check_spawn_kill_clear(expect):
+    store = EntityStore(4)
+    a = store.spawn(10, 20, 3, 4, dx=1, dy=-2, pen=0xFF00FF, flags=FLAG_USER)
+    b = store.spawn(30, 40)
+    store.kill(a)
+    live = [store.live[k] for k in range(store.count)]
+    killed = not store.alive(a) and store.alive(b) and live == [b]
+    store.clear()
+    cleared = store.count == 0 and not store.alive(b) and store.spawn(0, 0) == 0
+    expect(
+        "spawn",
+        (a, b) == (0, 1) and killed and cleared and not consistency(store)
+        and (store.x[b], store.y[b], store.w[b], store.h[b]) == (30, 40, 0, 0),
+        f"slots {a}, {b}; after kill({a}) live is {live}; after clear() spawn gets slot 0: {cleared}",
+    )
+    store = EntityStore(4)
+    a = store.spawn(10, 20, 3, 4, dx=1, dy=-2, pen=0xFF00FF, flags=FLAG_USER)
+    columns = (store.x[a], store.y[a], store.w[a], store.h[a], store.dx[a], store.dy[a], store.pen[a], store.flags[a])
+    expect(
+        "columns",
+        columns == (10, 20, 3, 4, 1, -2, 0xFF00FF, FLAG_USER | FLAG_ALIVE),
+        f"x, y, w, h, dx, dy, pen, flags = {columns}",
+    )
+
+
+def check_reuse_order(expect):
+    store = EntityStore(5)
+    first = [store.spawn(i, 0) for i in range(5)]
+    store.kill(3)
+    store.kill(1)
+    reused = [store.spawn(0, 0), store.spawn(0, 0)]
+    store.clear()
+    after_clear = [store.spawn(0, 0) for _ in range(3)]
+    expect(
+        "reuse",
+        first == [0, 1, 2, 3, 4] and reused == [1, 3] and after_clear == [0, 1, 2] and not consistency(store),
+        f"fresh {first}, after kill(3), kill(1): {reused}, after clear(): {after_clear}",
+    )
+
+
+def check_full(expect):
+    store = EntityStore(3)
+    slots = [store.spawn(i, i) for i in range(4)]
+    count = store.count
+    store.kill(slots[1])
+    again = store.spawn(7, 7)
+    expect(
+        "full",
+        slots == [0, 1, 2, -1] and count == 3 and again == 1 and store.x[1] == 7 and not consistency(store),
+        f"spawns returned {slots}, count {count}, after a kill spawn returned {again}",
+    )
+
+
+def check_double_kill(expect):
+    store = EntityStore(4)
+    for i in range(3):
+        store.spawn(i, 0)
+    store.kill(1)
+    state = (store.count, store._free_count, [store.live[k] for k in range(store.count)])
+    store.kill(1)
+    store.kill(3)  # Never spawned
+    same = (store.count, store._free_count, [store.live[k] for k in range(store.count)]) == state
+    count = store.count
+    slots = [store.spawn(0, 0), store.spawn(0, 0), store.spawn(0, 0)]
+    expect(
+        "twice",
+        same and slots == [1, 3, -1] and not consistency(store),
+        f"second kill left count {count} and live unchanged: {same}; spawns then returned {slots}",
+    )
+
+
+def check_backward_walk(expect):
+    """Kills by a predicate while walking live backwards, as the games do."""
+    rng = random.Random(SEED)
+    problems = []
+    for trial in range(200):
+        capacity = rng.randint(1, 40)
+        store = EntityStore(capacity)
+        for i in range(capacity):
+            store.spawn(rng.randint(0, 99), i)
+        for _ in range(rng.randint(0, capacity)):  # Shuffle live with some kills and respawns
+            store.kill(rng.randrange(capacity))
+        for _ in range(rng.randint(0, capacity)):
+            store.spawn(rng.randint(0, 99), 0)
+        before = {store.live[k] for k in range(store.count)}
+        doomed = {i for i in before if store.x[i] < 50}
+        visited = []
+        for k in range(store.count - 1, -1, -1):
+            i = store.live[k]
+            visited.append(i)
+            if store.x[i] < 50:
+                store.kill(i)
+        after = {store.live[k] for k in range(store.count)}
+        problem = consistency(store)
+        if sorted(visited) != sorted(before):
+            problem = f"visited {sorted(visited)}, live was {sorted(before)}"
+        elif after != before - doomed:
+            problem = f"left {sorted(after)}, expected {sorted(before - doomed)}"
+        if problem:
+            problems.append(f"trial {trial}: {problem}")
+    expect(
+        "walk",
+        not problems,
+        problems[0] if problems else "200 random stores: every entity visited once, only the matching ones killed",
+    )
+
+
+def check_breakout_collisions(expect, directory):
+    """Puts the ball on a corner of the last live brick, next to its
+    neighbours, with live out of slot order, and checks that every brick
+    hit is scored and killed once and the store stays consistent."""
+    path = os.path.join(directory, "level.bin")
+    write_level(path, 10, host_stubs.WIDTH // (breakout.BRICK_WIDTH + 2), gaps=False)
+    breakout.LEVEL_FILE = path
+    ctx = console.Context(host_stubs.Display())
+    problems = []
+    hits = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        breakout.init(ctx)
+        bricks = breakout.bricks
+        rng = random.Random(SEED)
+        for trial in range(100):
+            breakout.reset_game()
+            breakout.game_state = "PLAYING"
+            # Knock out random bricks so live is out of slot order
+            for _ in range(rng.randint(0, bricks.count // 2)):
+                i = bricks.live[rng.randrange(bricks.count)]
+                bricks.kill(i)
+                breakout.brick_layer.alive[i] = 0
+            # Aim at a corner of the last live brick: kill() moves it into any hole
+            target = bricks.live[bricks.count - 1]
+            breakout.ball_x = bricks.x[target] + rng.choice((0, bricks.w[target]))
+            breakout.ball_y = bricks.y[target] + rng.choice((0, bricks.h[target]))
+            breakout.ball_dx = 3
+            breakout.ball_dy = -3
+            before = {bricks.live[k] for k in range(bricks.count)}
+            score = breakout.score
+            breakout.check_collisions()
+            after = {bricks.live[k] for k in range(bricks.count)}
+            killed = before - after
+            hits += len(killed)
+            problem = consistency(bricks)
+            if not killed:
+                problem = "no brick hit"
+            elif breakout.score - score != 10 * len(killed):
+                problem = f"{len(killed)} bricks killed but score rose {breakout.score - score}"
+            elif any(breakout.brick_layer.alive[i] for i in killed) or not after <= before:
+                problem = "brick layer and store disagree"
+            if problem:
+                problems.append(f"trial {trial}: {problem}")
+    expect(
+        "breakout",
+        not problems,
+        problems[0] if problems else f"100 frames, {hits} bricks hit, each scored and killed once",
+    )
+
+
+def main():
+    failed = []
+
+    def expect(name, ok, detail):
+        print(f"{name:<8} {'ok  ' if ok else 'FAIL'} {detail}")
+        if not ok:
+            failed.append(name)
+
+    check_spawn_kill_clear(expect)
+    check_reuse_order(expect)
+    check_full(expect)
+    check_double_kill(expect)
+    check_backward_walk(expect)
+    with tempfile.TemporaryDirectory() as directory:
+        check_breakout_collisions(expect, directory)
+        if breakout.level is not None:
+            breakout.level.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import time
+from array import array
+from machine import Pin
+import deadline
+import idle
+import jobs
+import telemetry
+from drawlist import DrawList
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Games written for the launcher are modules with five functions:
+#
+#   init(ctx)          Set up state for a new session (called on every launch).
+#   update(dt, input)  Advance one frame. dt is milliseconds since the last update.
+#   draw(gfx)          Render the current frame into gfx (ctx.gfx). The
+#                      launcher then updates the display.
+#   suspend()          The player left; keep loaded state if it is cheap.
+#   shutdown()         The module is being unloaded; drop large buffers.
+#
+# The launcher owns the loop: run() is a coroutine on main.py's event loop.
+# An input task samples the buttons between frames and detects the double-
+# click exit on X; run() paces frames, idles on static screens, watches frame
+# deadlines (see deadline.py), feeds the watchdog and records frame
+# telemetry. The slack at the end of each frame is offered to background
+# jobs (see jobs.py).
+#
+# A game may set DEADLINE_MS (default FRAME_MS) and should read
+# ctx.degrade_level to shed work when frames keep running late. A game that
+# sets BATCH_DRAWS = True draws into a DrawList (drawlist.py), which the
+# launcher flushes after draw(); otherwise gfx is the display itself.
+
+# --- Buttons (bit masks for Input.held / Input.pressed) ---
+BUTTON_A = 1
+BUTTON_B = 2
+BUTTON_X = 4
+BUTTON_Y = 8
+BUTTON_PINS = ((BUTTON_A, 12), (BUTTON_B, 13), (BUTTON_X, 14), (BUTTON_Y, 15))
+
+DOUBLE_CLICK_INTERVAL_MS = 300
+DEFAULT_FRAME_MS = 20
+INPUT_POLL_MS = 5  # Sampling period of the input task while a frame waits
+HIST_MS = 64  # Frame-time histogram: 1 ms buckets, the last one holds anything slower
+
+# --- Session (read by tools such as autopilot.py) ---
+session = None  # FrameStats of the running or last session
+active = None  # Game module being driven by run(), once it is initialised
+
+
+class Context:
+    """What a game gets from the launcher in init(ctx)."""
+
+    def __init__(self, display):
+        self.display = display
+        # Games draw through gfx: the display, or for a game that sets
+        # BATCH_DRAWS a DrawList that batches the frame's primitives by pen
+        self.gfx = display
+        self.batched = False
+        self.drawlist = None  # Allocated by the first batching game
+        self.width, self.height = display.get_bounds()
+        # Set by the game when its screen will not change until a button is
+        # pressed; the launcher then draws it once and idles.
+        self.static = False
+        self.exit_requested = False
+        # deadline.LEVEL_*, raised by the launcher while frames miss their deadline
+        self.degrade_level = deadline.LEVEL_FULL
+
+    def request_exit(self):
+        self.exit_requested = True
+
+    def batch_draws(self, batched):
+        """Points gfx at the DrawList (batched) or straight at the display."""
+        if batched and self.drawlist is None:
+            self.drawlist = DrawList(self.display)
+        self.batched = batched
+        self.gfx = self.drawlist if batched else self.display
+
+
+class Input:
+    """Button state for one frame, with edges and double-click exit.
+
+    sample() reads the pins and latches presses; the input task calls it
+    while a frame waits, so a tap shorter than a frame is not missed.
+    poll() samples once more and publishes the state for the next update.
+    """
+
+    def __init__(self):
+        self.pins = []
+        self._masks = []
+        for mask, gpio in BUTTON_PINS:
+            self.pins.append(Pin(gpio, Pin.IN, Pin.PULL_UP))
+            self._masks.append(mask)
+        self.state = 0
+        self.previous = 0
+        self.exit_requested = False
+        self._raw = 0
+        self._latched = 0  # Presses since the last poll()
+        self._x_press_time = 0
+        self._x_presses = 0
+
+    def reset(self):
+        self.state = self.previous = self._raw = self.read()
+        self._latched = 0
+        self.exit_requested = False
+        self._x_presses = 0
+
+    def read(self):
+        state = 0
+        for i in range(len(self.pins)):
+            if self.pins[i].value() == 0:
+                state |= self._masks[i]
+        return state
+
+    def sample(self, now_ms):
+        raw = self.read()
+        down = raw & ~self._raw
+        self._raw = raw
+        self._latched |= down
+        # Double click on X: two presses starting within the interval
+        if down & BUTTON_X:
+            if self._x_presses and time.ticks_diff(now_ms, self._x_press_time) < DOUBLE_CLICK_INTERVAL_MS:
+                print("X Double Click: Exiting game!")
+                self.exit_requested = True
+            else:
+                self._x_presses = 1
+                self._x_press_time = now_ms
+        elif self._x_presses and time.ticks_diff(now_ms, self._x_press_time) >= DOUBLE_CLICK_INTERVAL_MS:
+            self._x_presses = 0
+
+    def poll(self, now_ms):
+        self.sample(now_ms)
+        self.previous = self.state & ~self._latched  # A latched press shows as an edge
+        self.state = self._raw | self._latched  # ... and as held for this frame
+        self._latched = 0
+
+    def held(self, mask):
+        return self.state & mask != 0
+
+    def pressed(self, mask):
+        """True only on the frame the button went down."""
+        return self.state & ~self.previous & mask != 0
+
+
+class FrameStats:
+    """Per-session frame timing collected by the scheduler."""
+
+    def __init__(self):
+        self.frames = 0
+        self.update_us = 0
+        self.draw_us = 0
+        self.max_frame_us = 0
+        self.idle_waits = 0
+        self.submitted = 0  # Draw calls made by a batching game
+        self.issued = 0  # Draw calls of a batching game that reached the display
+        self.monitor = None  # deadline.FrameMonitor for the session
+        self.hist = array("I", bytes(4 * HIST_MS))  # Frames per whole millisecond of frame time
+
+    def percentile(self, p):
+        """Frame time in ms that p percent of the frames did not exceed."""
+        target = (self.frames * p + 99) // 100
+        seen = 0
+        for ms in range(HIST_MS):
+            seen += self.hist[ms]
+            if seen >= target:
+                return ms
+        return HIST_MS - 1
+
+    def report(self):
+        if not self.frames:
+            return "Frames: 0"
+        return (
+            f"Frames: {self.frames}, update avg {self.update_us // self.frames} us, "
+            f"draw avg {self.draw_us // self.frames} us, max frame {self.max_frame_us} us, "
+            f"p50/p95/p99 {self.percentile(50)}/{self.percentile(95)}/{self.percentile(99)} ms, "
+            f"idle waits {self.idle_waits}"
+            + (
+                f", draw calls per frame {self.submitted // self.frames} submitted / "
+                f"{self.issued // self.frames} issued" if self.submitted else ""
+            )
+        )
+
+
+async def _sample_input(buttons):
+    while True:
+        buttons.sample(time.ticks_ms())
+        await asyncio.sleep_ms(INPUT_POLL_MS)
+
+
+async def run(game, ctx, buttons):
+    """Drives game until the player double-clicks X or the game requests exit."""
+    global session, active
+    ctx.batch_draws(getattr(game, "BATCH_DRAWS", False))
+    display = ctx.display
+    gfx = ctx.gfx
+    batched = ctx.batched
+    frame_ms = getattr(game, "FRAME_MS", DEFAULT_FRAME_MS)
+    stats = session = FrameStats()
+    monitor = deadline.FrameMonitor(getattr(game, "DEADLINE_MS", frame_ms))
+    stats.monitor = monitor
+    ctx.static = False
+    ctx.exit_requested = False
+    ctx.degrade_level = deadline.LEVEL_FULL
+    buttons.reset()
+    game.init(ctx)
+    active = game
+    static_drawn = False
+    static_render_us = 0
+    last_ms = time.ticks_ms()
+    input_task = asyncio.create_task(_sample_input(buttons))
+    try:
+        while True:
+            deadline.feed()
+            frame_start = time.ticks_us()
+            now = time.ticks_ms()
+            buttons.poll(now)
+            if buttons.exit_requested or ctx.exit_requested:
+                break
+            dt = time.ticks_diff(now, last_ms)
+            last_ms = now
+            game.update(dt, buttons)
+            update_end = time.ticks_us()
+
+            if ctx.static and static_drawn and buttons.state == buttons.previous:
+                # Screen already shown and nothing changes until a button is pressed
+                stats.idle_waits += 1
+                await idle.wait(buttons.pins, static_render_us, frame_ms)
+                last_ms = time.ticks_ms()
+                continue
+
+            drawn = not (
+                ctx.degrade_level >= deadline.LEVEL_HALF_RATE
+                and not ctx.static
+                and monitor.frames & 1
+            )
+            if not drawn:
+                # Overloaded: logic runs every frame, rendering every other one
+                monitor.skipped_draws += 1
+            else:
+                game.draw(gfx)
+                if batched:
+                    gfx.end_frame()
+                display.update()
+            frame_end = time.ticks_us()
+            frame_us = time.ticks_diff(frame_end, frame_start)
+            if ctx.static:
+                static_drawn = True
+                static_render_us = frame_us
+            else:
+                static_drawn = False
+                stats.frames += 1
+                stats.update_us += time.ticks_diff(update_end, frame_start)
+                stats.draw_us += time.ticks_diff(frame_end, update_end)
+                if drawn and batched:
+                    stats.submitted += gfx.last_submitted
+                    stats.issued += gfx.last_issued
+                if frame_us > stats.max_frame_us:
+                    stats.max_frame_us = frame_us
+                stats.hist[frame_us // 1000 if frame_us < HIST_MS * 1000 else HIST_MS - 1] += 1
+                ctx.degrade_level = monitor.frame(frame_us)
+                telemetry.record(telemetry.EV_FRAME, frame_us, getattr(game, "score", 0))
+            telemetry.flush()
+
+            remaining = frame_ms - frame_us // 1000
+            if remaining > 0:
+                await jobs.idle_for(remaining)
+            else:
+                await asyncio.sleep_ms(0)
+    finally:
+        active = None
+        input_task.cancel()
+        game.suspend()
+    return stats
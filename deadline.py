@@ -0,0 +1,132 @@
+from array import array
+import machine
+import telemetry
+
+# Every launcher frame has a deadline (the game's frame period unless it sets
+# DEADLINE_MS). FrameMonitor counts the frames that miss it and, when misses
+# keep coming, steps the game down one degradation level at a time; after a
+# stretch without misses it steps back up. The launcher publishes the level
+# as ctx.degrade_level:
+#
+#   LEVEL_FULL           Normal rendering.
+#   LEVEL_SKIP_HUD       Score and lives are redrawn only when they change.
+#   LEVEL_FEWER_EFFECTS  Particle bursts are thinned to a quarter.
+#   LEVEL_HALF_RATE      The launcher draws every other frame; update() still
+#                        runs every frame, so the game keeps its speed.
+#
+# The same module owns the hardware watchdog. The launcher feeds it every
+# frame and every idle slice, so a game stuck in update() or draw() stops
+# the feeding and the board restarts into the menu.
+
+LEVEL_FULL = 0
+LEVEL_SKIP_HUD = 1
+LEVEL_FEWER_EFFECTS = 2
+LEVEL_HALF_RATE = 3
+LEVEL_NAMES = ("full", "skip_hud", "fewer_effects", "half_rate")
+
+WINDOW_FRAMES = 30  # Misses are judged over windows of this many frames
+DEGRADE_MISSES = 10  # Misses in one window that count as sustained overload
+RECOVER_WINDOWS = 2  # Clean windows in a row before stepping back up
+MAX_TRANSITIONS = 16  # Level changes kept for the report
+
+WATCHDOG_TIMEOUT_MS = 8000  # Close to the RP2 limit of 8388 ms
+
+
+class FrameMonitor:
+    """Deadline bookkeeping for one game session."""
+
+    def __init__(self, target_ms):
+        self.target_us = target_ms * 1000
+        self.level = LEVEL_FULL
+        self.frames = 0
+        self.missed = 0
+        self.worst_us = 0
+        self.skipped_draws = 0  # Frames not drawn at LEVEL_HALF_RATE
+        self.max_level = LEVEL_FULL
+        self._window_frames = 0
+        self._window_missed = 0
+        self._clean_windows = 0
+        # Ring of recent transitions: frame number and the level entered
+        self.transition_frames = array("i", bytes(4 * MAX_TRANSITIONS))
+        self.transition_levels = bytearray(MAX_TRANSITIONS)
+        self.transitions = 0
+
+    def frame(self, frame_us):
+        """Records one frame's time; returns the degradation level for the next."""
+        self.frames += 1
+        if frame_us > self.target_us:
+            self.missed += 1
+            self._window_missed += 1
+            if frame_us > self.worst_us:
+                self.worst_us = frame_us
+        self._window_frames += 1
+        if self._window_frames >= WINDOW_FRAMES:
+            if self._window_missed >= DEGRADE_MISSES:
+                self._clean_windows = 0
+                if self.level < LEVEL_HALF_RATE:
+                    self._set_level(self.level + 1)
+            elif self._window_missed == 0:
+                self._clean_windows += 1
+                if self._clean_windows >= RECOVER_WINDOWS and self.level > LEVEL_FULL:
+                    self._clean_windows = 0
+                    self._set_level(self.level - 1)
+            else:
+                self._clean_windows = 0
+            self._window_frames = 0
+            self._window_missed = 0
+        return self.level
+
+    def _set_level(self, level):
+        slot = self.transitions % MAX_TRANSITIONS
+        self.transition_frames[slot] = self.frames
+        self.transition_levels[slot] = level
+        self.transitions += 1
+        self.level = level
+        if level > self.max_level:
+            self.max_level = level
+        telemetry.record(telemetry.EV_DEGRADE, value=level)
+
+    def report(self):
+        """One-line summary of misses and level changes."""
+        if not self.frames:
+            return "Deadline: no frames"
+        first = max(0, self.transitions - MAX_TRANSITIONS)
+        changes = " ".join(
+            f"{LEVEL_NAMES[self.transition_levels[i % MAX_TRANSITIONS]]}@{self.transition_frames[i % MAX_TRANSITIONS]}"
+            for i in range(first, self.transitions)
+        )
+        return (
+            f"Deadline {self.target_us // 1000} ms: missed {self.missed}/{self.frames} "
+            f"({self.missed * 100 // self.frames}%), worst {self.worst_us // 1000} ms, "
+            f"skipped draws {self.skipped_draws}, level {LEVEL_NAMES[self.level]} "
+            f"(max {LEVEL_NAMES[self.max_level]}), "
+            f"transitions {self.transitions}" + (f": {changes}" if changes else "")
+        )
+
+
+# --- Watchdog ---
+_wdt = None
+
+
+def start_watchdog(timeout_ms=WATCHDOG_TIMEOUT_MS):
+    """Starts the hardware watchdog. It cannot be stopped until the next reset."""
+    global _wdt
+    try:
+        _wdt = machine.WDT(timeout=timeout_ms)
+    except (AttributeError, ValueError) as e:
+        print(f"Watchdog unavailable: {e}")
+        _wdt = None
+    return _wdt is not None
+
+
+def feed():
+    if _wdt is not None:
+        _wdt.feed()
+
+
+def reset_by_watchdog():
+    """True if the last reset was the watchdog firing (a game hung)."""
+    try:
+        return machine.reset_cause() == machine.WDT_RESET
+    except AttributeError:
+        return False
@@ -0,0 +1,296 @@
+from array import array
+
+# --- Commands ---
+# Each command is STRIDE ints in one flat array: op, pen, then up to six args.
+STRIDE = 8
+OP_BARRIER = 0
+OP_CLEAR = 1
+OP_RECT = 2
+OP_CIRCLE = 3
+OP_TRIANGLE = 4
+OP_TEXT = 5  # args: text slot, x, y, scale
+OP_PIXEL = 6
+OP_LINE = 7
+
+MAX_GROUPS = 12  # Distinct pens grouped per segment; beyond this, draw in order
+
+
+class DrawList:
+    """Frame-level command buffer with the drawing half of the PicoGraphics API.
+
+    Primitives are recorded into a preallocated flat array and issued to the
+    display by flush(). Between barriers, commands are grouped by pen so each
+    pen is set once per segment; commands keep their relative order within a
+    pen. Primitives entirely off screen are dropped when recorded, and a
+    clear() discards everything recorded before it in the frame. Call
+    barrier() where later primitives must cover earlier ones of another pen.
+    """
+
+    def __init__(self, display, capacity=256, text_capacity=16):
+        self.display = display
+        self.width, self.height = display.get_bounds()
+        self.capacity = capacity
+        self.cmds = array("i", bytes(4 * STRIDE * capacity))
+        self.texts = [None] * text_capacity
+        self.count = 0
+        self.text_count = 0
+        self.pen = 0
+        # Scratch for flush(): the segment's pens, its runs of commands with
+        # one pen (first command, pen group) and the runs sorted by group
+        self._groups = array("i", bytes(4 * MAX_GROUPS))
+        self._counts = array("H", bytes(2 * MAX_GROUPS))
+        self._run_start = array("H", bytes(2 * (capacity + 1)))
+        self._run_group = array("B", bytes(capacity))
+        self._order = array("H", bytes(2 * capacity))
+        # Counters for the current frame; copied to last_* by end_frame().
+        # submitted counts set_pen and primitive calls made by the game;
+        # issued counts primitives and pen changes sent to the display.
+        self.submitted = 0
+        self.culled = 0
+        self.occluded = 0
+        self.issued = 0
+        self.pens_set = 0
+        self._current_pen = -1
+        self.last_submitted = 0
+        self.last_issued = 0
+        self.last_pens_set = 0
+
+    # --- PicoGraphics pass-through ---
+    def get_bounds(self):
+        return self.width, self.height
+
+    def create_pen(self, r, g, b):
+        return self.display.create_pen(r, g, b)
+
+    def measure_text(self, text, scale=1, *args):
+        return self.display.measure_text(text, scale=scale)
+
+    # --- Recording ---
+    def set_pen(self, pen):
+        self.submitted += 1
+        self.pen = pen
+
+    def _record(self, op, a=0, b=0, c=0, d=0, e=0, f=0):
+        if self.count >= self.capacity:
+            self.flush()
+        cmds = self.cmds
+        i = self.count * STRIDE
+        cmds[i] = op
+        cmds[i + 1] = self.pen
+        cmds[i + 2] = a
+        cmds[i + 3] = b
+        cmds[i + 4] = c
+        cmds[i + 5] = d
+        cmds[i + 6] = e
+        cmds[i + 7] = f
+        self.count += 1
+
+    def _cull(self):
+        self.submitted += 1
+        self.culled += 1
+
+    def clear(self):
+        # Everything recorded so far this frame is covered
+        self.submitted += 1
+        self.occluded += self.count
+        self.count = 0
+        self.text_count = 0
+        self._record(OP_CLEAR)
+
+    def barrier(self):
+        if self.count and self.cmds[(self.count - 1) * STRIDE] != OP_BARRIER:
+            self._record(OP_BARRIER)
+
+    # The primitives below are the per-frame hot path: each culls against the
+    # screen inline and writes its command directly, one call per primitive.
+    def rectangle(self, x, y, w, h):
+        if x + w <= 0 or y + h <= 0 or x >= self.width or y >= self.height:
+            self._cull()
+            return
+        self.submitted += 1
+        if self.count >= self.capacity:
+            self.flush()
+        cmds = self.cmds
+        i = self.count * STRIDE
+        cmds[i] = OP_RECT
+        cmds[i + 1] = self.pen
+        cmds[i + 2] = x
+        cmds[i + 3] = y
+        cmds[i + 4] = w
+        cmds[i + 5] = h
+        self.count += 1
+
+    def circle(self, x, y, r):
+        if x + r < 0 or y + r < 0 or x - r >= self.width or y - r >= self.height:
+            self._cull()
+            return
+        self.submitted += 1
+        if self.count >= self.capacity:
+            self.flush()
+        cmds = self.cmds
+        i = self.count * STRIDE
+        cmds[i] = OP_CIRCLE
+        cmds[i + 1] = self.pen
+        cmds[i + 2] = x
+        cmds[i + 3] = y
+        cmds[i + 4] = r
+        self.count += 1
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        if (
+            (x1 < 0 and x2 < 0 and x3 < 0)
+            or (y1 < 0 and y2 < 0 and y3 < 0)
+            or (x1 >= self.width and x2 >= self.width and x3 >= self.width)
+            or (y1 >= self.height and y2 >= self.height and y3 >= self.height)
+        ):
+            self._cull()
+            return
+        self.submitted += 1
+        self._record(OP_TRIANGLE, x1, y1, x2, y2, x3, y3)
+
+    def pixel(self, x, y):
+        if x < 0 or y < 0 or x >= self.width or y >= self.height:
+            self._cull()
+            return
+        self.submitted += 1
+        self._record(OP_PIXEL, x, y)
+
+    def line(self, x1, y1, x2, y2):
+        if (
+            (x1 < 0 and x2 < 0)
+            or (y1 < 0 and y2 < 0)
+            or (x1 >= self.width and x2 >= self.width)
+            or (y1 >= self.height and y2 >= self.height)
+        ):
+            self._cull()
+            return
+        self.submitted += 1
+        self._record(OP_LINE, x1, y1, x2, y2)
+
+    def text(self, text, x, y, wordwrap=None, scale=1):
+        # Width is not measured here (that costs as much as drawing); only
+        # text starting past the right or bottom edge, or above the top, is culled.
+        if x >= self.width or y >= self.height or y + 8 * scale <= 0:
+            self._cull()
+            return
+        self.submitted += 1
+        if self.text_count >= len(self.texts) or self.count >= self.capacity:
+            self.flush()
+        slot = self.text_count
+        self.texts[slot] = text
+        self.text_count += 1
+        self._record(OP_TEXT, slot, x, y, scale)
+
+    # --- Issuing ---
+    def _issue(self, start, end):
+        """Issues commands start..end-1, setting the pen only where it changes."""
+        cmds = self.cmds
+        texts = self.texts
+        display = self.display
+        current = self._current_pen
+        pens_set = 0
+        for i in range(start * STRIDE, end * STRIDE, STRIDE):
+            pen = cmds[i + 1]
+            if pen != current:
+                display.set_pen(pen)
+                current = pen
+                pens_set += 1
+            op = cmds[i]
+            if op == OP_RECT:
+                display.rectangle(cmds[i + 2], cmds[i + 3], cmds[i + 4], cmds[i + 5])
+            elif op == OP_CIRCLE:
+                display.circle(cmds[i + 2], cmds[i + 3], cmds[i + 4])
+            elif op == OP_TEXT:
+                display.text(texts[cmds[i + 2]], cmds[i + 3], cmds[i + 4], scale=cmds[i + 5])
+            elif op == OP_TRIANGLE:
+                display.triangle(cmds[i + 2], cmds[i + 3], cmds[i + 4], cmds[i + 5], cmds[i + 6], cmds[i + 7])
+            elif op == OP_CLEAR:
+                display.clear()
+            elif op == OP_PIXEL:
+                display.pixel(cmds[i + 2], cmds[i + 3])
+            elif op == OP_LINE:
+                display.line(cmds[i + 2], cmds[i + 3], cmds[i + 4], cmds[i + 5])
+        self._current_pen = current
+        self.pens_set += pens_set
+        self.issued += end - start
+
+    def _issue_grouped(self, n_runs, n_groups):
+        """Issues the segment's runs pen group by pen group (a counting sort
+        of the runs); runs of one pen keep their recorded order."""
+        run_start = self._run_start
+        run_group = self._run_group
+        counts = self._counts
+        order = self._order
+        for g in range(n_groups):
+            counts[g] = 0
+        for r in range(n_runs):
+            counts[run_group[r]] += 1
+        offset = 0
+        for g in range(n_groups):
+            c = counts[g]
+            counts[g] = offset
+            offset += c
+        for r in range(n_runs):
+            g = run_group[r]
+            order[counts[g]] = r
+            counts[g] += 1
+        for k in range(n_runs):
+            r = order[k]
+            self._issue(run_start[r], run_start[r + 1])
+
+    def flush(self):
+        """Issues every recorded command to the display, pen by pen per segment."""
+        cmds = self.cmds
+        groups = self._groups
+        run_start = self._run_start
+        run_group = self._run_group
+        n = self.count
+        start = 0
+        while start < n:
+            # One pass to the next barrier: split the segment into runs of one
+            # pen and number the pens in order of first use
+            last_pen = groups[0] = cmds[start * STRIDE + 1]
+            run_start[0] = start
+            run_group[0] = 0
+            n_runs = n_groups = 1
+            in_order = True
+            end = n
+            for i in range(start * STRIDE, n * STRIDE, STRIDE):
+                if cmds[i] == OP_BARRIER:
+                    end = i // STRIDE
+                    break
+                if cmds[i + 1] != last_pen and n_groups <= MAX_GROUPS:
+                    last_pen = cmds[i + 1]
+                    g = 0
+                    while g < n_groups and groups[g] != last_pen:
+                        g += 1
+                    if g == n_groups:
+                        if n_groups < MAX_GROUPS:
+                            groups[g] = last_pen
+                        n_groups += 1  # Past MAX_GROUPS: issued in recorded order
+                    else:
+                        in_order = False  # A pen seen earlier in the segment comes back
+                    run_start[n_runs] = i // STRIDE
+                    run_group[n_runs] = g
+                    n_runs += 1
+            if in_order or n_groups > MAX_GROUPS:
+                # One pen, or each pen's commands already together
+                self._issue(start, end)
+            else:
+                run_start[n_runs] = end
+                self._issue_grouped(n_runs, n_groups)
+            start = end + 1
+        self.count = 0
+        for i in range(self.text_count):
+            self.texts[i] = None
+        self.text_count = 0
+
+    def end_frame(self):
+        """Flushes and rolls the frame counters into last_*."""
+        self.flush()
+        # Others may draw to the display between frames (the launcher menu)
+        self._current_pen = -1
+        self.last_submitted = self.submitted
+        self.last_issued = self.issued + self.pens_set
+        self.last_pens_set = self.pens_set
+        self.submitted = self.culled = self.occluded = self.issued = self.pens_set = 0
@@ -0,0 +1,86 @@
+from array import array
+
+# Entity flags. FLAG_ALIVE is managed by the store; games may use the others.
+FLAG_ALIVE = 1
+FLAG_USER = 2  # First bit free for game use
+
+
+class EntityStore:
+    """Fixed-capacity entities kept column-wise in typed arrays.
+
+    Each entity is a slot index into the columns x, y, dx, dy, w, h (int16),
+    pen (uint32) and flags (uint8): 17 bytes per entity, plus 6 bytes of
+    bookkeeping. Creating or removing an entity never allocates. Free slots
+    are kept on a stack; clear() refills it so slots are handed out from 0
+    upwards again.
+
+    live[0:count] holds the live slot indices. kill() fills the hole with the
+    last live index, so when killing inside a loop, walk live backwards:
+
+        for k in range(store.count - 1, -1, -1):
+            i = store.live[k]
+            ...
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.x = array("h", bytes(2 * capacity))
+        self.y = array("h", bytes(2 * capacity))
+        self.dx = array("h", bytes(2 * capacity))
+        self.dy = array("h", bytes(2 * capacity))
+        self.w = array("h", bytes(2 * capacity))
+        self.h = array("h", bytes(2 * capacity))
+        self.pen = array("I", bytes(4 * capacity))
+        self.flags = bytearray(capacity)
+        self.live = array("H", bytes(2 * capacity))
+        self.count = 0
+        self._where = array("H", bytes(2 * capacity))  # Slot -> position in live
+        self._free = array("H", bytes(2 * capacity))
+        self._free_count = 0
+        self.clear()
+
+    def clear(self):
+        """Kills every entity."""
+        flags = self.flags
+        free = self._free
+        top = self.capacity - 1
+        for i in range(self.capacity):
+            flags[i] = 0
+            free[i] = top - i
+        self._free_count = self.capacity
+        self.count = 0
+
+    def spawn(self, x, y, w=0, h=0, dx=0, dy=0, pen=0, flags=0):
+        """Adds an entity and returns its slot, or -1 if the store is full."""
+        if self._free_count == 0:
+            return -1
+        self._free_count -= 1
+        i = self._free[self._free_count]
+        self.x[i] = x
+        self.y[i] = y
+        self.w[i] = w
+        self.h[i] = h
+        self.dx[i] = dx
+        self.dy[i] = dy
+        self.pen[i] = pen
+        self.flags[i] = flags | FLAG_ALIVE
+        self.live[self.count] = i
+        self._where[i] = self.count
+        self.count += 1
+        return i
+
+    def kill(self, i):
+        """Removes the entity in slot i; does nothing if it is not alive."""
+        if not self.flags[i] & FLAG_ALIVE:
+            return
+        self.flags[i] = 0
+        self.count -= 1
+        k = self._where[i]
+        last = self.live[self.count]
+        self.live[k] = last
+        self._where[last] = k
+        self._free[self._free_count] = i
+        self._free_count += 1
+
+    def alive(self, i):
+        return self.flags[i] & FLAG_ALIVE != 0
@@ -0,0 +1,178 @@
+"""Minimal stand-ins for the Pico hardware modules, for running on CPython.
+
+install() registers fake `picographics` and `machine` modules and adds the
+MicroPython-only functions the games use (time.ticks_ms, gc.mem_free,
+asyncio.sleep_ms, ...).
+Nothing is drawn: the display only counts calls. Buttons read from
+`pin_levels` (GPIO number -> 0 pressed / 1 released, or a callable).
+"""
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import types
+
+WIDTH = 320
+HEIGHT = 240
+HEAP_SIZE = 200 * 1024  # Reported by gc.mem_free() minus traced allocations
+
+pin_levels = {}
+
+
+class Display:
+    """PicoGraphics look-alike that records how many calls were made."""
+
+    def __init__(self, display=None, rotate=0, **kwargs):
+        self.calls = 0
+        self.pen_changes = 0
+        self.updates = 0
+        self.backlight = 1.0
+
+    def get_bounds(self):
+        return WIDTH, HEIGHT
+
+    def create_pen(self, r, g, b):
+        return (r << 16) | (g << 8) | b
+
+    def set_pen(self, pen):
+        self.calls += 1
+        self.pen_changes += 1
+
+    def clear(self):
+        self.calls += 1
+
+    def rectangle(self, x, y, w, h):
+        self.calls += 1
+
+    def circle(self, x, y, r):
+        self.calls += 1
+
+    def triangle(self, x1, y1, x2, y2, x3, y3):
+        self.calls += 1
+
+    def pixel(self, x, y):
+        self.calls += 1
+
+    def line(self, x1, y1, x2, y2, *args):
+        self.calls += 1
+
+    def text(self, text, x, y, wordwrap=None, scale=1, *args, **kwargs):
+        self.calls += 1
+
+    def measure_text(self, text, scale=1, *args, **kwargs):
+        return len(text) * 6 * scale
+
+    def set_backlight(self, level):
+        self.backlight = level
+
+    def update(self):
+        self.updates += 1
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=None, pull=None, value=None):
+        self.id = id
+        self._out = 1 if value is None else value
+
+    def value(self, v=None):
+        if v is not None:
+            self._out = v
+            return None
+        level = pin_levels.get(self.id, 1)
+        return level() if callable(level) else level
+
+    def init(self, *args, **kwargs):
+        pass
+
+    def irq(self, handler=None, trigger=None):
+        return None
+
+    def toggle(self):
+        self._out ^= 1
+
+
+class PWM:
+    def __init__(self, pin, **kwargs):
+        self.pin = pin
+
+    def freq(self, value=None):
+        return 1000
+
+    def duty_u16(self, value=None):
+        return 0
+
+    def deinit(self):
+        pass
+
+
+class Timer:
+    def __init__(self, id=-1, **kwargs):
+        pass
+
+    def init(self, **kwargs):
+        pass
+
+    def deinit(self):
+        pass
+
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout = timeout
+
+    def feed(self):
+        pass
+
+
+def _ticks_ms():
+    return time.perf_counter_ns() // 1000000
+
+
+def _ticks_us():
+    return time.perf_counter_ns() // 1000
+
+
+def _mem_alloc():
+    return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+
+def install():
+    """Registers the stubs. Safe to call more than once."""
+    if "machine" in sys.modules and "picographics" in sys.modules:
+        return
+    picographics = types.ModuleType("picographics")
+    picographics.PicoGraphics = Display
+    picographics.DISPLAY_PICO_DISPLAY_2 = 1
+    sys.modules["picographics"] = picographics
+
+    machine = types.ModuleType("machine")
+    machine.Pin = Pin
+    machine.PWM = PWM
+    machine.WDT = WDT
+    machine.Timer = Timer
+    machine.SPI = object
+    machine.PWRON_RESET = 1
+    machine.WDT_RESET = 3
+    machine.reset_cause = lambda: machine.PWRON_RESET
+    machine.lightsleep = lambda ms=0: time.sleep(ms / 1000)
+    machine.idle = lambda: None
+    machine.reset = lambda: sys.exit("machine.reset()")
+    sys.modules["machine"] = machine
+
+    time.ticks_ms = _ticks_ms
+    time.ticks_us = _ticks_us
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+    time.sleep_us = lambda us: time.sleep(us / 1000000)
+    asyncio.sleep_ms = lambda ms: asyncio.sleep(ms / 1000)
+    gc.mem_alloc = _mem_alloc
+    gc.mem_free = lambda: HEAP_SIZE - _mem_alloc()
+    sys.print_exception = lambda e, file=None: __import__("traceback").print_exception(e)
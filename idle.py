@@ -0,0 +1,143 @@
+import time
+import machine
+from machine import Pin
+import telemetry
+import deadline
+import jobs
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Static screens (menu, title, game over) are drawn once; the caller then
+# awaits wait() until a button is pressed. That time goes first to background
+# work on the event loop (jobs.py, the leaderboard task); when there is none
+# the CPU spends it in machine.lightsleep, woken early by a button interrupt
+# or at the end of each IDLE_TICK_MS slice, instead of redrawing the same
+# frame every 20-50 ms.
+
+IDLE_TICK_MS = 20  # Upper bound on wakeup latency if the IRQ cannot end lightsleep
+DIM_AFTER_MS = 30000  # Dim the backlight after this long without input
+BACKLIGHT_DIM = 0.2  # display.set_backlight() levels, 0.0 to 1.0
+BACKLIGHT_ON = 1.0
+
+# --- Counters (since boot) ---
+waits = 0
+idle_ms = 0  # Time spent inside wait()
+dimmed_ms = 0
+redraws_avoided = 0  # Frames the old polling loops would have redrawn
+render_ms_saved = 0  # CPU time those redraws would have cost
+wakeups = 0  # Wakeups triggered by a button interrupt
+latency_us_total = 0
+latency_us_max = 0
+
+# Returns True while another task needs the event loop (main.py sets it to
+# leaderboard.pending); the slice is then yielded to it instead of slept.
+background = None
+
+# The PicoGraphics display (main.py sets it). Dimming goes through its
+# set_backlight(), which owns the backlight pin; driving the pin directly
+# would leave set_backlight() without effect.
+display = None
+
+_irq_at_us = 0
+_irq_fired = False
+
+
+def _on_press(pin):
+    global _irq_at_us, _irq_fired
+    if not _irq_fired:
+        _irq_at_us = time.ticks_us()
+        _irq_fired = True
+
+
+async def _sleep_slice():
+    deadline.feed()
+    if jobs.pending() or (background is not None and background()):
+        jobs.poke()
+        await asyncio.sleep_ms(IDLE_TICK_MS)
+        return
+    try:
+        machine.lightsleep(IDLE_TICK_MS)
+    except (AttributeError, OSError):
+        time.sleep_ms(IDLE_TICK_MS)
+    await asyncio.sleep_ms(0)  # Timers that came due while asleep
+
+
+def _dim():
+    if display is not None:
+        display.set_backlight(BACKLIGHT_DIM)
+
+
+def _undim():
+    if display is not None:
+        display.set_backlight(BACKLIGHT_ON)
+
+
+def _any_pressed(pins):
+    for pin in pins:
+        if pin.value() == 0:
+            return True
+    return False
+
+
+async def wait(pins, render_us=0, baseline_ms=50):
+    """Returns once one of pins (active low) is pressed.
+
+    render_us is what one redraw of the current screen costs and baseline_ms
+    is how often the old loop redrew it; both only feed the savings counters.
+    """
+    global waits, idle_ms, dimmed_ms, redraws_avoided, render_ms_saved
+    global wakeups, latency_us_total, latency_us_max, _irq_fired
+    if _any_pressed(pins):
+        # Button still held from the last action: poll gently until released
+        await asyncio.sleep_ms(IDLE_TICK_MS)
+        return
+    telemetry.flush(force=True)
+    _irq_fired = False
+    for pin in pins:
+        pin.irq(trigger=Pin.IRQ_FALLING, handler=_on_press)
+    start = time.ticks_ms()
+    dim_start = 0
+    dimmed = False
+    jobs.open_window()
+    try:
+        while not _irq_fired and not _any_pressed(pins):
+            await _sleep_slice()
+            if not dimmed and time.ticks_diff(time.ticks_ms(), start) >= DIM_AFTER_MS:
+                _dim()
+                dimmed = True
+                dim_start = time.ticks_ms()
+    finally:
+        jobs.close_window()
+        for pin in pins:
+            pin.irq(handler=None)
+    woke_us = time.ticks_us()
+    if dimmed:
+        _undim()
+        dimmed_ms += time.ticks_diff(time.ticks_ms(), dim_start)
+    elapsed = time.ticks_diff(time.ticks_ms(), start)
+    waits += 1
+    idle_ms += elapsed
+    redraws = elapsed // baseline_ms
+    redraws_avoided += redraws
+    render_ms_saved += redraws * render_us // 1000
+    latency = 0
+    if _irq_fired:
+        latency = time.ticks_diff(woke_us, _irq_at_us)
+        wakeups += 1
+        latency_us_total += latency
+        if latency > latency_us_max:
+            latency_us_max = latency
+    telemetry.record(telemetry.EV_IDLE, frame_us=latency, value=elapsed)
+
+
+def report():
+    """One-line summary of the idle counters."""
+    avg = latency_us_total // wakeups if wakeups else 0
+    return (
+        f"Idle: {waits} waits, {idle_ms} ms asleep, {dimmed_ms} ms dimmed, "
+        f"{redraws_avoided} redraws avoided (~{render_ms_saved} ms CPU), "
+        f"wakeup latency avg {avg} us / max {latency_us_max} us"
+    )
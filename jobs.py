@@ -0,0 +1,163 @@
+import gc
+import sys
+import time
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Background jobs (garbage collection, preloading a game module, ...) run on
+# the launcher's event loop, but only inside idle windows: the slack at the
+# end of a frame, a static screen waiting for a button, or a pause such as
+# the "Startar..." screen. The worker task picks a job only if its measured
+# worst run time fits in what is left of the window; a job that has never
+# run waits for an open-ended window (a static screen). Jobs are plain
+# functions and cannot be interrupted, so each one's run time is the delay
+# it can add to the next frame or button press; it is recorded per job name.
+
+MAX_JOBS = 8  # Queued one-off jobs; submit() refuses more
+GC_INTERVAL_MS = 1000  # How often the housekeeping collection is considered
+GC_MIN_GROWTH = 4096  # Collect only if the heap grew this much since the last one
+
+# --- Queue ---
+_queue = []  # (name, function) in submission order
+_periodic = []  # [name, function, period_ms, next due ticks_ms]
+_window_open = False
+_window_end = 0  # ticks_ms; ignored while _unbounded
+_unbounded = False
+_wake = asyncio.Event()
+
+# --- Counters ---
+_stats = {}  # name -> [runs, total_us, max_us, overruns]
+dropped = 0  # Jobs refused because the queue was full
+_alloc_after_gc = 0
+
+
+def submit(name, function):
+    """Queues function to run once in a coming idle window."""
+    global dropped
+    if len(_queue) >= MAX_JOBS:
+        dropped += 1
+        return False
+    _queue.append((name, function))
+    poke()
+    return True
+
+
+def every(name, period_ms, function):
+    """Runs function in an idle window at most once per period_ms."""
+    _periodic.append([name, function, period_ms, time.ticks_add(time.ticks_ms(), period_ms)])
+
+
+def _fits(name, now):
+    if _unbounded:
+        return True
+    stats = _stats.get(name)
+    return stats is not None and time.ticks_diff(_window_end, now) * 1000 >= stats[2]
+
+
+def _pick(now, take):
+    """The next job that fits the open window, or None. take=True dequeues it."""
+    if not _window_open:
+        return None
+    for i in range(len(_queue)):
+        if _fits(_queue[i][0], now):
+            return _queue.pop(i) if take else _queue[i]
+    for job in _periodic:
+        if time.ticks_diff(now, job[3]) >= 0 and _fits(job[0], now):
+            if take:
+                job[3] = time.ticks_add(now, job[2])
+            return job[0], job[1]
+    return None
+
+
+def pending():
+    """True if a job could run in the window that is open now."""
+    return _pick(time.ticks_ms(), False) is not None
+
+
+def poke():
+    """Wakes the worker if a job can run now."""
+    if pending():
+        _wake.set()
+
+
+def open_window(ms=None):
+    """Lets jobs run for the next ms milliseconds, or until close_window()."""
+    global _window_open, _window_end, _unbounded
+    _window_open = True
+    _unbounded = ms is None
+    if ms is not None:
+        _window_end = time.ticks_add(time.ticks_ms(), ms)
+    poke()
+
+
+def on_static_screen():
+    """True while an open-ended window is open (a screen waiting for a button)."""
+    return _window_open and _unbounded
+
+
+def close_window():
+    global _window_open
+    _window_open = False
+
+
+async def idle_for(ms):
+    """Sleeps ms milliseconds, letting jobs that fit run meanwhile."""
+    open_window(ms)
+    try:
+        await asyncio.sleep_ms(ms)
+    finally:
+        close_window()
+
+
+def _run(name, function):
+    bounded = not _unbounded
+    start = time.ticks_us()
+    try:
+        function()
+    except Exception as e:
+        print(f"!!! Job {name} failed !!!")
+        sys.print_exception(e)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = [0, 0, 0, 0]
+    stats[0] += 1
+    stats[1] += elapsed
+    if elapsed > stats[2]:
+        stats[2] = elapsed
+    if bounded and time.ticks_diff(time.ticks_ms(), _window_end) > 0:
+        stats[3] += 1  # Ran past the window: the next frame started late
+
+
+async def worker():
+    """Task that runs queued and periodic jobs inside idle windows."""
+    while True:
+        job = _pick(time.ticks_ms(), True)
+        if job is None:
+            _wake.clear()
+            await _wake.wait()
+            continue
+        _run(job[0], job[1])
+        await asyncio.sleep_ms(0)  # Let input and the frame loop run between jobs
+
+
+# --- Housekeeping ---
+def collect_garbage():
+    """Collects only if the heap has grown since the last collection, so an
+    idle console does not keep walking an unchanged heap."""
+    global _alloc_after_gc
+    if gc.mem_alloc() - _alloc_after_gc >= GC_MIN_GROWTH:
+        gc.collect()
+        _alloc_after_gc = gc.mem_alloc()
+
+
+def report():
+    """One line per job name: runs, average and worst run time, overruns."""
+    lines = [f"Jobs: {dropped} dropped"]
+    for name in sorted(_stats):
+        runs, total_us, max_us, overruns = _stats[name]
+        lines.append(f"  {name}: {runs} runs, avg {total_us // runs} us, max {max_us} us, {overruns} overruns")
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+from array import array
+
+# PicoGraphics keeps its framebuffer between update() calls, so a static layer
+# can live in the framebuffer itself: it is painted once, and each frame only
+# the rectangles touched by moving sprites are erased and patched back.
+
+
+class GridLayer:
+    """A grid of solid cells (e.g. bricks) retained in the framebuffer.
+
+    Cells are indexed row-major. redraw() paints the whole grid once; after
+    that, kill() erases a single cell and repair() repaints only the cells that
+    overlap a rectangle, so the per-frame cost does not depend on cell count.
+    """
+
+    def __init__(self, display, x, y, cell_w, cell_h, pitch_x, pitch_y, cols, rows, background):
+        self.display = display
+        self.x = x
+        self.y = y
+        self.cell_w = cell_w
+        self.cell_h = cell_h
+        self.pitch_x = pitch_x
+        self.pitch_y = pitch_y
+        self.cols = cols
+        self.rows = rows
+        self.background = background
+        self.pens = array("I", bytes(4 * cols * rows))
+        self.alive = bytearray(cols * rows)
+        self.cells_drawn = 0  # Cells painted since the counter was last reset
+
+    def set_cell(self, index, pen):
+        self.pens[index] = pen
+        self.alive[index] = 1
+
+    def clear_cells(self):
+        for i in range(len(self.alive)):
+            self.alive[i] = 0
+
+    def shift_down(self):
+        """Moves every cell down one row; the bottom row is lost and the top row
+        is left empty. The framebuffer is not touched: call redraw() afterwards."""
+        pens = self.pens
+        alive = self.alive
+        cols = self.cols
+        for i in range(cols * self.rows - 1, cols - 1, -1):
+            pens[i] = pens[i - cols]
+            alive[i] = alive[i - cols]
+        for i in range(cols):
+            alive[i] = 0
+
+    def redraw(self):
+        """Paints every live cell. Call after the screen has been cleared."""
+        self._paint(0, self.cols, 0, self.rows)
+
+    def kill(self, index):
+        """Removes a cell and erases it from the framebuffer."""
+        if not self.alive[index]:
+            return
+        self.alive[index] = 0
+        row, col = divmod(index, self.cols)
+        self.display.set_pen(self.background)
+        self.display.rectangle(
+            self.x + col * self.pitch_x, self.y + row * self.pitch_y, self.cell_w, self.cell_h
+        )
+
+    def repair(self, x, y, w, h):
+        """Repaints the live cells overlapping the rectangle (x, y, w, h)."""
+        col0 = (x - self.x) // self.pitch_x
+        col1 = (x + w - 1 - self.x) // self.pitch_x + 1
+        row0 = (y - self.y) // self.pitch_y
+        row1 = (y + h - 1 - self.y) // self.pitch_y + 1
+        if col0 < 0:
+            col0 = 0
+        if row0 < 0:
+            row0 = 0
+        if col1 > self.cols:
+            col1 = self.cols
+        if row1 > self.rows:
+            row1 = self.rows
+        if col0 < col1 and row0 < row1:
+            self._paint(col0, col1, row0, row1)
+
+    def _paint(self, col0, col1, row0, row1):
+        display = self.display
+        pens = self.pens
+        alive = self.alive
+        cols = self.cols
+        current_pen = -1
+        for row in range(row0, row1):
+            cell_y = self.y + row * self.pitch_y
+            index = row * cols + col0
+            for col in range(col0, col1):
+                if alive[index]:
+                    pen = pens[index]
+                    if pen != current_pen:
+                        display.set_pen(pen)
+                        current_pen = pen
+                    display.rectangle(self.x + col * self.pitch_x, cell_y, self.cell_w, self.cell_h)
+                    self.cells_drawn += 1
+                index += 1
+
+
+class DirtyRects:
+    """Rectangles drawn by moving sprites this frame, to be erased next frame."""
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.rects = array("h", bytes(8 * capacity))
+        self.count = 0
+
+    def add(self, x, y, w, h):
+        if self.count >= self.capacity or w <= 0 or h <= 0:
+            return
+        i = self.count * 4
+        self.rects[i] = x
+        self.rects[i + 1] = y
+        self.rects[i + 2] = w
+        self.rects[i + 3] = h
+        self.count += 1
+
+    def restore(self, display, background, layer=None):
+        """Erases every recorded rectangle and patches the layer underneath."""
+        rects = self.rects
+        # Barriers keep a batching display (drawlist.py) from reordering
+        # the erase, the repair and the sprites drawn afterwards.
+        barrier = getattr(display, "barrier", None)
+        display.set_pen(background)
+        for i in range(0, self.count * 4, 4):
+            display.rectangle(rects[i], rects[i + 1], rects[i + 2], rects[i + 3])
+        if layer is not None:
+            if barrier is not None:
+                barrier()
+            for i in range(0, self.count * 4, 4):
+                layer.repair(rects[i], rects[i + 1], rects[i + 2], rects[i + 3])
+        if barrier is not None:
+            barrier()
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
@@ -0,0 +1,399 @@
+import json
+import struct
+import time
+import net
+import jobs
+
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Scores are posted to a leaderboard server over HTTP in the background.
+# submit() only appends the score to a small queue file on flash and ranks
+# it against a cached copy of the server's top list, so the game-over screen
+# never waits on the network. A task on the launcher's event loop sends the
+# queue in batches over one kept-alive connection, backs off while the server
+# is slow or down, and refreshes the cached top lists. A sync only starts
+# while the console waits on a static screen, so it never competes with
+# gameplay frames. Add to wifi_config.py:
+#
+#   LEADERBOARD_HOST = "192.168.1.20"  # An IP address avoids a blocking DNS lookup
+#   LEADERBOARD_PORT = 8080
+#
+# Server API (leaderboard_server.py is a stand-in for testing):
+#   POST /scores   {"device": "...", "scores": [[seq, game, score], ...]} -> {"accepted": n}
+#   GET  /top?game=G&n=N                                                 -> {"scores": [...]}
+# The server ignores a (device, seq) pair it has seen, so a batch resent
+# after a lost reply is not counted twice.
+
+QUEUE_FILE = "scores.q"
+QUEUE_CAPACITY = 32  # Oldest scores are dropped beyond this
+CACHE_FILE = "leaderboard.json"
+TOP_N = 10
+MAX_BATCH = 8  # Scores per POST
+REQUEST_TIMEOUT_S = 3
+BACKOFF_MIN_MS = 1000
+BACKOFF_MAX_MS = 60000
+CACHE_TTL_MS = 300000  # Refresh the top lists this often
+POLL_S = 0.2
+DEFAULT_PORT = 8080
+
+# --- Queue file ---
+# Header: magic, version, capacity, next sequence number, head slot, count
+QUEUE_HEADER = "<2sBBIHH"
+QUEUE_HEADER_SIZE = struct.calcsize(QUEUE_HEADER)
+QUEUE_MAGIC = b"SQ"
+QUEUE_VERSION = 1
+# Record: sequence number, game id, score
+QUEUE_RECORD = "<IBi"
+QUEUE_RECORD_SIZE = struct.calcsize(QUEUE_RECORD)
+
+
+class ScoreQueue:
+    """Bounded FIFO of scores kept in a file, so unsent scores survive a restart."""
+
+    def __init__(self, path, capacity=QUEUE_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.next_seq = 0
+        self.head = 0
+        self.count = 0
+        self.dropped = 0
+        self._record = bytearray(QUEUE_RECORD_SIZE)
+        try:
+            self.file = open(path, "r+b")
+            magic, version, capacity, self.next_seq, self.head, self.count = struct.unpack(
+                QUEUE_HEADER, self.file.read(QUEUE_HEADER_SIZE)
+            )
+            if magic != QUEUE_MAGIC or version != QUEUE_VERSION or capacity != self.capacity:
+                raise ValueError("queue file format changed")
+        except (OSError, ValueError):
+            # Missing, damaged or from another version: start empty
+            try:
+                self.file.close()
+            except AttributeError:
+                pass
+            self.file = open(path, "w+b")
+            self.next_seq = self.head = self.count = 0
+            self.file.write(bytes(QUEUE_HEADER_SIZE + self.capacity * QUEUE_RECORD_SIZE))
+            self._write_header()
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(
+            struct.pack(QUEUE_HEADER, QUEUE_MAGIC, QUEUE_VERSION, self.capacity, self.next_seq, self.head, self.count)
+        )
+        self.file.flush()
+
+    def push(self, game, score):
+        if self.count == self.capacity:
+            self.head = (self.head + 1) % self.capacity
+            self.count -= 1
+            self.dropped += 1
+        slot = (self.head + self.count) % self.capacity
+        struct.pack_into(QUEUE_RECORD, self._record, 0, self.next_seq, game, score)
+        self.file.seek(QUEUE_HEADER_SIZE + slot * QUEUE_RECORD_SIZE)
+        self.file.write(self._record)
+        self.next_seq += 1
+        self.count += 1
+        self._write_header()
+
+    def peek(self, n):
+        """The oldest n scores as [seq, game, score] lists, without removing them."""
+        items = []
+        for i in range(min(n, self.count)):
+            slot = (self.head + i) % self.capacity
+            self.file.seek(QUEUE_HEADER_SIZE + slot * QUEUE_RECORD_SIZE)
+            self.file.readinto(self._record)
+            items.append(list(struct.unpack(QUEUE_RECORD, self._record)))
+        return items
+
+    def remove(self, n):
+        n = min(n, self.count)
+        self.head = (self.head + n) % self.capacity
+        self.count -= n
+        self._write_header()
+
+    def close(self):
+        self.file.close()
+
+
+# --- State ---
+_host = None
+_port = DEFAULT_PORT
+_device = "pico"
+_games = ()
+_queue = None
+_cache_path = CACHE_FILE
+_cache = {}  # game id -> top scores, highest first
+_cache_ms = {}  # game id -> ticks_ms of the last refresh from the server
+_cache_unsaved = False  # Scores added by submit() are not in the cache file yet
+_reader = None
+_writer = None
+_task = None
+_busy = False  # A sync is in progress (possibly waiting on the server)
+_backoff_ms = 0
+_next_try_ms = 0
+
+# --- Counters ---
+sent = 0
+failures = 0
+connections = 0
+refreshes = 0
+last_error = ""
+
+
+def _device_id():
+    name = net.setting("DEVICE_NAME")
+    if name:
+        return name
+    try:
+        import machine
+
+        return "".join("%02x" % b for b in machine.unique_id())
+    except (ImportError, AttributeError):
+        return "pico"
+
+
+def init(host=None, port=None, games=(), queue_path=QUEUE_FILE, cache_path=CACHE_FILE):
+    """Opens the score queue and loads the cached top lists. Returns enabled()."""
+    global _host, _port, _device, _games, _queue, _cache, _cache_ms, _backoff_ms, _next_try_ms
+    global _cache_path
+    close()
+    _host = host or net.setting("LEADERBOARD_HOST")
+    _port = port or net.setting("LEADERBOARD_PORT", DEFAULT_PORT)
+    _device = _device_id()
+    _games = tuple(games)
+    _cache_path = cache_path
+    _cache = {}
+    _cache_ms = {}
+    _backoff_ms = 0
+    _next_try_ms = 0
+    try:
+        with open(cache_path) as f:
+            for game, scores in json.load(f).items():
+                _cache[int(game)] = scores
+    except (OSError, ValueError):
+        pass
+    if _host:
+        _queue = ScoreQueue(queue_path)
+    return enabled()
+
+
+def enabled():
+    return _queue is not None
+
+
+def queued():
+    return _queue.count if _queue is not None else 0
+
+
+# --- Ranking (local, instant) ---
+def rank(game, score):
+    """1-based position of score in the cached top list, or 0 if outside it."""
+    scores = _cache.get(game, ())
+    position = 1
+    for s in scores:
+        if s > score:
+            position += 1
+    return position if position <= TOP_N else 0
+
+
+def synced(game):
+    """True if the cached list for game has come from the server."""
+    return game in _cache_ms
+
+
+def rank_text(game, position):
+    """Line for a game-over screen describing a rank from submit()."""
+    if not position:
+        return f"Utanför topp {TOP_N}"  # Outside the top N
+    if not synced(game):
+        return f"Plats {position} (lokalt)"  # Not yet compared with the server
+    return f"Plats {position} på topplistan"
+
+
+def submit(game, score):
+    """Queues score for upload and returns its rank (see rank()); 0 if the
+    leaderboard is not enabled, when games show no rank at all."""
+    global _cache_unsaved
+    if not enabled():
+        return 0
+    position = rank(game, score)
+    scores = _cache.setdefault(game, [])
+    if position:
+        scores.insert(position - 1, score)
+        del scores[TOP_N:]
+        _cache_unsaved = True
+    _queue.push(game, score)
+    return position
+
+
+# --- HTTP over one kept-alive connection ---
+def _close_connection():
+    global _reader, _writer
+    if _writer is not None:
+        try:
+            _writer.close()
+        except OSError:
+            pass
+    _reader = _writer = None
+
+
+async def _request(method, path, body=None):
+    global _reader, _writer, connections
+    if _writer is None:
+        _reader, _writer = await asyncio.open_connection(_host, _port)
+        connections += 1
+    data = json.dumps(body).encode() if body is not None else b""
+    _writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {_host}\r\nConnection: keep-alive\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+    )
+    if data:
+        _writer.write(data)
+    await _writer.drain()
+    status_line = await _reader.readline()
+    if not status_line:
+        raise OSError("connection closed")
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[0].startswith(b"HTTP/") or not parts[1].isdigit():
+        raise OSError("bad status line")
+    status = int(parts[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await _reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+    payload = await _reader.readexactly(length) if length else b""
+    if not keep_alive:
+        _close_connection()
+    return status, json.loads(payload) if payload else None
+
+
+async def _call(method, path, body=None):
+    try:
+        status, reply = await asyncio.wait_for(_request(method, path, body), REQUEST_TIMEOUT_S)
+    except BaseException:
+        # Timed out or failed midway: the connection state is unknown
+        _close_connection()
+        raise
+    if status != 200:
+        raise OSError(f"HTTP {status}")
+    return reply
+
+
+def _save_cache():
+    global _cache_unsaved
+    _cache_unsaved = False
+    try:
+        with open(_cache_path, "w") as f:
+            json.dump(_cache, f)
+    except OSError:
+        pass
+
+
+async def _sync():
+    """Sends queued scores, then refreshes the stale top lists."""
+    global sent, refreshes
+    posted = False
+    while _queue.count:
+        batch = _queue.peek(MAX_BATCH)
+        await _call("POST", "/scores", {"device": _device, "scores": batch})
+        _queue.remove(len(batch))
+        sent += len(batch)
+        posted = True
+    changed = False
+    for game in _games:
+        last = _cache_ms.get(game)
+        if posted or last is None or time.ticks_diff(time.ticks_ms(), last) >= CACHE_TTL_MS:
+            reply = await _call("GET", f"/top?game={game}&n={TOP_N}")
+            scores = reply.get("scores") if isinstance(reply, dict) else None
+            if not isinstance(scores, list) or not all(isinstance(s, int) for s in scores):
+                raise ValueError("bad top list")
+            scores = scores[:TOP_N]
+            if scores != _cache.get(game):
+                _cache[game] = scores
+                changed = True
+            _cache_ms[game] = time.ticks_ms()
+            refreshes += 1
+    if changed or _cache_unsaved:
+        _save_cache()
+
+
+def _work_due():
+    if not jobs.on_static_screen():
+        return False
+    if _queue is None or (_queue.count == 0 and not _refresh_due()):
+        return False
+    return time.ticks_diff(time.ticks_ms(), _next_try_ms) >= 0
+
+
+def _refresh_due():
+    now = time.ticks_ms()
+    for game in _games:
+        last = _cache_ms.get(game)
+        if last is None or time.ticks_diff(now, last) >= CACHE_TTL_MS:
+            return True
+    return False
+
+
+async def run():
+    """Background task: syncs whenever there is work, backing off on failure."""
+    global _busy, _backoff_ms, _next_try_ms, failures, last_error
+    while True:
+        if net.is_connected() and _work_due():
+            _busy = True
+            try:
+                await _sync()
+                _backoff_ms = 0
+            except Exception as e:  # Any failure backs off; the task must not end
+                failures += 1
+                last_error = repr(e)
+                _backoff_ms = min(max(BACKOFF_MIN_MS, _backoff_ms * 2), BACKOFF_MAX_MS)
+                # Jitter keeps many consoles from retrying in step
+                _next_try_ms = time.ticks_add(time.ticks_ms(), _backoff_ms + time.ticks_us() % 500)
+            _busy = False
+        await asyncio.sleep(POLL_S)
+
+
+# --- Background task ---
+def start():
+    """Creates the sync task on the running event loop (main.py's)."""
+    global _task
+    if enabled() and _task is None:
+        _task = asyncio.create_task(run())
+
+
+def pending():
+    """True if the sync task has something to do now, so idle.py yields to it."""
+    return _task is not None and (_busy or (net.is_connected() and _work_due()))
+
+
+def close():
+    global _queue, _task, _busy
+    _close_connection()
+    if _task is not None:
+        _task.cancel()
+        _task = None
+    _busy = False
+    if _queue is not None:
+        _queue.close()
+        _queue = None
+
+
+def report():
+    """One-line summary of the sync counters."""
+    return (
+        f"Leaderboard: {sent} sent, {queued()} queued, {_queue.dropped if _queue else 0} dropped, "
+        f"{failures} failures, {connections} connections, {refreshes} refreshes, "
+        f"backoff {_backoff_ms} ms" + (f", last error {last_error}" if last_error else "")
+    )
@@ -0,0 +1,321 @@
+"""Host-side stand-in for the leaderboard server used by leaderboard.py.
+
+Run on a computer on the same network as the Pico:
+
+    python leaderboard_server.py --port 8080 [--delay 5]
+
+and set LEADERBOARD_HOST / LEADERBOARD_PORT in wifi_config.py on the Pico.
+--delay holds every reply back, to see the console ride out a slow server.
+`python leaderboard_server.py --check` runs leaderboard.py against an
+in-process server through normal, slow-server, server-down (with a restart
+of the console in between), broken-reply and queue-overflow scenarios, and
+exits non-zero if any of them fails.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+class Board:
+    """Top scores per game; ignores (device, seq) pairs it has already seen."""
+
+    def __init__(self):
+        self.scores = {}  # game id -> list of scores
+        self.seen = set()
+        self.posts = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.delay = 0.0
+        self.broken = ""  # "status": reply with garbage; "top": send a bad top list
+
+    def post(self, body):
+        self.posts += 1
+        accepted = 0
+        for seq, game, score in body["scores"]:
+            key = (body["device"], seq)
+            if key in self.seen:
+                self.duplicates += 1
+                continue
+            self.seen.add(key)
+            self.scores.setdefault(game, []).append(score)
+            accepted += 1
+        self.accepted += accepted
+        return {"accepted": accepted}
+
+    def top(self, game, n):
+        return {"game": game, "scores": sorted(self.scores.get(game, ()), reverse=True)[:n]}
+
+
+async def _handle(board, reader, writer):
+    """Serves requests on one connection until the client closes it (keep-alive)."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            method, target, _ = request_line.decode().split(" ", 2)
+            length = 0
+            close = False
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+                elif name.strip().lower() == "connection" and value.strip().lower() == "close":
+                    close = True
+            body = await reader.readexactly(length) if length else b""
+            if board.delay:
+                await asyncio.sleep(board.delay)
+            if board.broken == "status":
+                writer.write(b"garbage\r\n\r\n")
+                await writer.drain()
+                break
+            path, _, query = target.partition("?")
+            params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+            status, reply = 200, None
+            try:
+                if method == "POST" and path == "/scores":
+                    reply = board.post(json.loads(body))
+                elif method == "GET" and path == "/top":
+                    reply = board.top(int(params["game"]), int(params.get("n", 10)))
+                    if board.broken == "top":
+                        reply["scores"] = "none"
+                else:
+                    status, reply = 404, {"error": "not found"}
+            except (KeyError, ValueError, TypeError):
+                status, reply = 400, {"error": "bad request"}
+            data = json.dumps(reply).encode()
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+            if close:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+class StandIn:
+    """Runs a Board's HTTP server on its own thread, so it can be stopped and
+    restarted while the client under test runs on the main thread."""
+
+    def __init__(self, board, port=0):
+        self.board = board
+        self.port = port
+        self._loop = None
+        self._thread = None
+        self._server = None
+        self._writers = set()
+
+    async def _client(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            await _handle(self.board, reader, writer)
+        finally:
+            self._writers.discard(writer)
+
+    def start(self):
+        ready = threading.Event()
+
+        async def main():
+            self._server = await asyncio.start_server(self._client, "127.0.0.1", self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete, args=(main(),), daemon=True)
+        self._thread.start()
+        ready.wait(5)
+
+    def stop(self):
+        """Closes the listening socket and every open connection."""
+
+        def shutdown():
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+
+        self._loop.call_soon_threadsafe(shutdown)
+        self._thread.join(5)
+        self._loop.close()
+
+
+def serve(port, delay):
+    board = Board()
+    board.delay = delay
+
+    async def main():
+        server = await asyncio.start_server(lambda r, w: _handle(board, r, w), "0.0.0.0", port)
+        print(f"Leaderboard listening on tcp/{port}" + (f", replies delayed {delay} s" if delay else ""))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        for game in sorted(board.scores):
+            print(f"game {game}: {board.top(game, 10)['scores']}")
+
+
+# --- Scenario check ---
+async def _drain(leaderboard, timeout_s):
+    """Runs the loop until the client's queue is empty and it is idle, or timeout_s passes."""
+    end = time.monotonic() + timeout_s
+    while time.monotonic() < end:
+        await asyncio.sleep(0.02)
+        if not leaderboard.queued() and not leaderboard.pending():
+            return True
+    return False
+
+
+async def _scenarios(leaderboard, jobs, directory, expect):
+    queue_path = os.path.join(directory, "scores.q")
+    cache_path = os.path.join(directory, "leaderboard.json")
+    games = (1, 2)
+    board = Board()
+    server = StandIn(board)
+    server.start()
+    jobs.open_window()  # As if waiting on a static screen, where syncs may start
+
+    def restart_client():
+        leaderboard.init("127.0.0.1", server.port, games, queue_path, cache_path)
+        leaderboard.start()
+
+    # Normal: scores go out in batches over one connection, ranks are cached
+    restart_client()
+    start = time.perf_counter()
+    for score in (120, 450, 300, 80, 610, 200, 90, 330, 50, 700):
+        leaderboard.submit(1, score)
+    submit_ms = (time.perf_counter() - start) * 1000
+    drained = await _drain(leaderboard, 5)
+    expect(
+        "normal",
+        drained and board.accepted == 10 and board.posts == 2 and leaderboard.connections == 1
+        and leaderboard.synced(1) and leaderboard.rank(1, 500) == 3,
+        f"{board.accepted} accepted in {board.posts} posts over {leaderboard.connections} connection(s), "
+        f"10 submits took {submit_ms:.1f} ms, rank of 500 is {leaderboard.rank(1, 500)}",
+    )
+
+    # Slow: replies arrive after the client timeout, so it backs off and
+    # resends; the server must not count the resent scores twice
+    board.delay = leaderboard.REQUEST_TIMEOUT_S * 2
+    rank = leaderboard.submit(1, 1000)
+    leaderboard.submit(1, 10)
+    await asyncio.sleep(1.5)
+    failures = leaderboard.failures
+    still_queued = leaderboard.queued()
+    board.delay = 0
+    drained = await _drain(leaderboard, 5)
+    expect(
+        "slow",
+        rank == 1 and failures > 0 and still_queued == 2 and drained and board.accepted == 12,
+        f"rank {rank} shown at once, {failures} timeouts, {still_queued} queued while slow, "
+        f"{board.accepted} accepted, {board.duplicates} resent duplicates ignored",
+    )
+
+    # Down: scores stay queued on flash across a restart of the console,
+    # ranks still come from the cache file, and all arrive once it is back
+    server.stop()
+    for score in (15, 25, 35):
+        leaderboard.submit(2, score)
+    await asyncio.sleep(1.0)
+    failures = leaderboard.failures - failures
+    restart_client()
+    restored = leaderboard.queued()
+    cached_rank = leaderboard.rank(1, 500)
+    server = StandIn(board, server.port)
+    server.start()
+    drained = await _drain(leaderboard, 5)
+    expect(
+        "down",
+        failures > 0 and restored == 3 and cached_rank == 4 and drained and board.accepted == 15,
+        f"{failures} failed attempts, {restored} queued after restart, cached rank of 500 is "
+        f"{cached_rank}, {board.accepted} accepted after the server came back",
+    )
+
+    # Broken: a garbage status line, then a bad top list; the task backs
+    # off and keeps running, and syncs once the server behaves again
+    failures = leaderboard.failures
+    board.broken = "status"
+    leaderboard.submit(1, 5)
+    await asyncio.sleep(0.5)
+    board.broken = "top"
+    await asyncio.sleep(0.8)
+    alive = not leaderboard._task.done()
+    failures = leaderboard.failures - failures
+    board.broken = ""
+    drained = await _drain(leaderboard, 5)
+    expect(
+        "broken",
+        alive and failures >= 2 and drained and board.accepted == 16 and leaderboard.synced(1),
+        f"{failures} failed attempts ({leaderboard.last_error}), task still running: {alive}, "
+        f"{board.accepted} accepted once the server was fixed",
+    )
+
+    # Overflow: the queue keeps only the newest QUEUE_CAPACITY scores
+    server.stop()
+    extra = 5
+    for i in range(leaderboard.QUEUE_CAPACITY + extra):
+        leaderboard.submit(2, i)
+    expect(
+        "overflow",
+        leaderboard.queued() == leaderboard.QUEUE_CAPACITY and leaderboard._queue.dropped == extra,
+        f"{leaderboard.queued()} queued, {leaderboard._queue.dropped} oldest dropped",
+    )
+    print(leaderboard.report())
+    leaderboard.close()
+    jobs.close_window()
+
+
+def check():
+    import host_stubs
+
+    host_stubs.install()
+    import jobs
+    import leaderboard
+
+    # Short timeouts so the failure scenarios finish in seconds
+    leaderboard.REQUEST_TIMEOUT_S = 0.3
+    leaderboard.BACKOFF_MIN_MS = 100
+    leaderboard.BACKOFF_MAX_MS = 400
+    failed = []
+
+    def expect(name, ok, detail):
+        print(f"{name:<8} {'ok  ' if ok else 'FAIL'} {detail}")
+        if not ok:
+            failed.append(name)
+
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(_scenarios(leaderboard, jobs, directory, expect))
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to hold back every reply")
+    parser.add_argument("--check", action="store_true", help="run the client scenarios and exit")
+    args = parser.parse_args(argv)
+    if args.check:
+        return check()
+    serve(args.port, args.delay)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
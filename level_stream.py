@@ -0,0 +1,124 @@
+import struct
+import time
+
+# Level file: a small header followed by one byte per cell, row by row.
+# Row 0 is the first row the player meets (the bottom of the first screen).
+# A cell byte is 0 for no brick, otherwise 1 + colour index.
+MAGIC = b"BL"
+VERSION = 1
+HEADER = "<2sBBH"  # magic, version, cols, rows
+HEADER_SIZE = struct.calcsize(HEADER)
+
+
+class LevelStream:
+    """Reads a level file in chunks of rows through a fixed set of buffers.
+
+    Only the chunk holding the next row to enter the screen and the one
+    being prefetched are in RAM, so memory use does not depend on the
+    number of rows in the level. Rows are expected to be read in increasing
+    order; chunks behind the reader are released for reuse.
+    """
+
+    def __init__(self, path, chunk_rows=8, buffers=2):
+        self.file = open(path, "rb")
+        magic, version, self.cols, self.rows = struct.unpack(HEADER, self.file.read(HEADER_SIZE))
+        if magic != MAGIC or version != VERSION:
+            self.file.close()
+            raise ValueError("not a level file: " + path)
+        self.chunk_rows = chunk_rows
+        self._bufs = [bytearray(chunk_rows * self.cols) for _ in range(buffers)]
+        self._chunk = [-1] * buffers  # Chunk number held by each buffer
+        # Counters
+        self.chunks_loaded = 0
+        self.load_us_max = 0
+
+    def _find(self, chunk):
+        for b in range(len(self._bufs)):
+            if self._chunk[b] == chunk:
+                return b
+        return -1
+
+    def _load(self, chunk):
+        b = self._find(-1)
+        if b < 0:
+            # No free buffer: reuse the one holding the oldest chunk
+            b = 0
+            for k in range(1, len(self._bufs)):
+                if self._chunk[k] < self._chunk[b]:
+                    b = k
+        start = time.ticks_us()
+        self.file.seek(HEADER_SIZE + chunk * self.chunk_rows * self.cols)
+        n = self.file.readinto(self._bufs[b])
+        buf = self._bufs[b]
+        for i in range(n or 0, len(buf)):  # Past the end of the level
+            buf[i] = 0
+        self._chunk[b] = chunk
+        self.chunks_loaded += 1
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        if elapsed > self.load_us_max:
+            self.load_us_max = elapsed
+        return b
+
+    def prefetch(self, row):
+        """Loads the chunk holding row now, so reading it later does not stall."""
+        if 0 <= row < self.rows:
+            chunk = row // self.chunk_rows
+            if self._find(chunk) < 0:
+                self._load(chunk)
+
+    def release_below(self, row):
+        """Frees the buffers whose rows all lie before row."""
+        for b in range(len(self._bufs)):
+            if self._chunk[b] >= 0 and (self._chunk[b] + 1) * self.chunk_rows <= row:
+                self._chunk[b] = -1
+
+    def read_row(self, row, out):
+        """Copies the cells of row into out (a bytearray of cols); all zero past the end."""
+        if row < 0 or row >= self.rows:
+            for c in range(len(out)):
+                out[c] = 0
+            return False
+        chunk = row // self.chunk_rows
+        b = self._find(chunk)
+        if b < 0:
+            b = self._load(chunk)
+        buf = self._bufs[b]
+        offset = (row - chunk * self.chunk_rows) * self.cols
+        cols = self.cols
+        for c in range(len(out)):
+            out[c] = buf[offset + c] if c < cols else 0
+        return True
+
+    def reset(self):
+        """Releases every buffer, for reading the level from the start again."""
+        for b in range(len(self._bufs)):
+            self._chunk[b] = -1
+
+    def resident_bytes(self):
+        return len(self._bufs) * self.chunk_rows * self.cols
+
+    def close(self):
+        self.file.close()
+
+
+def write_level(path, rows, cols, colors=5, seed=1, gaps=True):
+    """Writes a generated level: one colour per row, about one cell in eight
+    left empty unless gaps is False."""
+    with open(path, "wb") as f:
+        f.write(struct.pack(HEADER, MAGIC, VERSION, cols, rows))
+        row = bytearray(cols)
+        for r in range(rows):
+            for c in range(cols):
+                seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+                row[c] = 0 if gaps and (seed >> 16) & 7 == 0 else 1 + r % colors
+            f.write(row)
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 3:
+        print("usage: python level_stream.py LEVEL_FILE ROWS [COLS]")
+        sys.exit(2)
+    write_level(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]) if len(sys.argv) > 3 else 10)
+    print(f"Wrote {sys.argv[1]}")
@@ -1,19 +1,30 @@
 import time
 import picographics
+import machine
 from machine import Pin
 import sys
 import gc # Make sure garbage collector is imported
+import net
+import telemetry
+import idle
+import console
+import deadline
+import leaderboard
+import jobs
+try: import asyncio
+except ImportError: import uasyncio as asyncio
 
 print("--- Starting main.py ---")
 
 # --- Display Setup ---
 try:
-    BACKLIGHT_PIN = 20
     display = picographics.PicoGraphics(display=picographics.DISPLAY_PICO_DISPLAY_2)
     WIDTH, HEIGHT = display.get_bounds()
     print(f"Display initialized ({WIDTH}x{HEIGHT})")
-    backlight = Pin(BACKLIGHT_PIN, Pin.OUT)
-    backlight.value(1)
+    # PicoGraphics owns the backlight pin (GPIO 20); driving it as a plain
+    # Pin would stop set_backlight() from working.
+    display.set_backlight(idle.BACKLIGHT_ON)
+    idle.display = display # Dims it on idle screens
     print("Backlight ON")
     # --- Initial Display Test ---
     WHITE_PEN_TEST = display.create_pen(255, 255, 255) # Removed GREEN_PEN definition
@@ -47,14 +58,114 @@ try:
 except Exception as e: print("!!! ERROR CREATING PENS !!!"); sys.print_exception(e)
 
 # --- Menu Configuration ---
-# !!! IMPORTANT: Replace filenames with your actual game files !!!
+# Entries with "module" implement the game lifecycle in console.py and are
+# driven by the launcher. Entries with only "file" are old-style scripts that
+# run their own loop and are executed with exec().
 games = [
-    { "name": "Stjärnfångare", "file": "star_catcher.py" }, # Avoid special chars in name for safety
-    { "name": "Ta bort klossar", "file": "breakout.py" }, # <<< CHANGE THIS FILENAME
+    { "name": "Stjärnfångare", "module": "star_catcher", "id": telemetry.GAME_STAR_CATCHER }, # Avoid special chars in name for safety
+    { "name": "Ta bort klossar", "module": "breakout", "id": telemetry.GAME_BREAKOUT },
 ]
 selected_index = 0
 menu_title = "Välj Spel" # Avoid special chars
 
+# --- Game Runtime ---
+game_context = console.Context(display)
+game_buttons = console.Input()
+loaded_games = {} # module name -> module, kept between launches
+UNLOAD_BELOW_BYTES = 60000 # Unload idle game modules when free heap drops below this
+PRELOAD_MIN_FREE = 90000 # Preload the highlighted game only with this much heap free
+preload_queued = False
+
+def unload_games(keep=None):
+    for name in list(loaded_games):
+        if name == keep: continue
+        print(f"Unloading {name}")
+        try: loaded_games[name].shutdown()
+        except Exception as e: sys.print_exception(e)
+        del loaded_games[name]
+        if name in sys.modules: del sys.modules[name]
+    gc.collect()
+
+class GameMissing(Exception):
+    # Loading the game failed: its file, or a module it imports at load time,
+    # is missing. Errors raised while it runs, ImportError included, go to
+    # the generic error screen with their message.
+    pass
+
+last_monitor = None # deadline.FrameMonitor of the last game that exited normally
+
+async def run_module_game(name):
+    global last_monitor
+    last_monitor = None # A failed launch must not show the previous game's figures
+    module = loaded_games.get(name)
+    if module is None:
+        if gc.mem_free() < UNLOAD_BELOW_BYTES: unload_games()
+        print(f"Importing {name}")
+        try: module = __import__(name)
+        except ImportError as e: raise GameMissing(e)
+        loaded_games[name] = module
+    else:
+        print(f"Reusing loaded module {name}")
+    stats = await console.run(module, game_context, game_buttons)
+    print(stats.report())
+    print(stats.monitor.report())
+    last_monitor = stats.monitor
+    telemetry.record(telemetry.EV_DEADLINE, frame_us=last_monitor.worst_us, value=last_monitor.missed)
+
+def run_script_game(filename, game_globals):
+    print(f"Opening {filename}")
+    # Old-style scripts run their own loop and never return to the launcher
+    # between frames, so a timer keeps the watchdog fed (a hang there is not caught)
+    feeder = None
+    try: feeder = machine.Timer(period=1000, callback=lambda t: deadline.feed())
+    except (AttributeError, ValueError): pass
+    try:
+        try: f = open(filename, "r")
+        except OSError as e: raise GameMissing(e)
+        with f:
+            game_code = f.read()
+            print(f"Read {len(game_code)} bytes. Executing...")
+            # Execute the code within the dedicated scope
+            exec(game_code, game_globals, game_globals)
+            print(f"Execution finished normally for {filename}")
+    finally:
+        if feeder is not None: feeder.deinit()
+
+async def wait_for_a():
+    # Error screens wait here; keep the watchdog fed while they do
+    while button_a.value() == 1:
+        deadline.feed()
+        await jobs.idle_for(100)
+
+def preload_selected():
+    # Background job: import the highlighted game while the menu waits, so
+    # launching it does not have to
+    global preload_queued
+    preload_queued = False
+    name = games[selected_index].get("module")
+    if name is None or name in loaded_games or gc.mem_free() < PRELOAD_MIN_FREE: return
+    print(f"Preloading {name}")
+    loaded_games[name] = __import__(name)
+
+def queue_preload():
+    global preload_queued
+    if not preload_queued: preload_queued = jobs.submit("preload", preload_selected)
+
+# --- Telemetry ---
+# Joins Wi-Fi in the background and streams records over UDP once connected.
+# Both calls return immediately; without wifi_config.py telemetry stays off.
+net.connect()
+if telemetry.init():
+    print("Telemetry enabled")
+
+# --- Leaderboard ---
+# Scores are queued on flash at game over and sent while the console idles on
+# a static screen (menu, title, game over); see leaderboard.py. The sync task
+# is started with the event loop below.
+if leaderboard.init(games=[game["id"] for game in games if "id" in game]):
+    idle.background = leaderboard.pending
+    print(f"Leaderboard enabled ({leaderboard.queued()} scores queued)")
+
 # --- Initial Display Test ---
 try:
     print("Starting blinking display test...")
@@ -88,8 +199,29 @@ except Exception as e:
     led = Pin("LED", Pin.OUT);
     while True: led.toggle(); time.sleep(0.1)
 
+# --- Watchdog ---
+# A game that hangs stops feeding the watchdog and the board restarts here.
+if deadline.reset_by_watchdog():
+    print("!!! Restarted by the watchdog: the last game stopped responding !!!")
+    display.set_pen(BLACK); display.clear(); display.set_pen(RED)
+    display.text("Spelet svarade inte", 10, 30, scale=2) # Game stopped responding
+    display.set_pen(WHITE); display.text("Omstartad", 10, 60, scale=2) # Restarted
+    display.update()
+    time.sleep(2)
+
 # --- Menu Functions ---
+menu_render_us = 0 # Cost of the last draw_menu(), for idle savings stats
+
+def deadline_summary(monitor):
+    # Short form of monitor.report() for the menu
+    text = f"Senast: {monitor.missed}/{monitor.frames} sena bilder" # Last: late frames
+    if monitor.missed: text += f", max {monitor.worst_us // 1000} ms"
+    if monitor.max_level: text += f", niva {monitor.max_level}" # Highest degrade level
+    return text
+
 def draw_menu():
+    global menu_render_us
+    render_start = time.ticks_us()
     try:
         display.set_pen(BLACK); display.clear()
         # Title
@@ -109,11 +241,16 @@ def draw_menu():
             else:
                 display.set_pen(WHITE)
                 display.text("  " + game["name"], 15, y_pos, scale=item_scale)
+        # Frame deadlines of the last game, so they survive without a REPL
+        if last_monitor is not None and last_monitor.frames:
+            display.set_pen(WHITE)
+            display.text(deadline_summary(last_monitor), 10, HEIGHT - 35, scale=1)
         # Instructions
         display.set_pen(GREEN); instr_scale = 2; instr_text = "B=Upp, Y=Ner, A=Starta spel"
         instr_width = display.measure_text(instr_text, scale=instr_scale)
         display.text(instr_text, (WIDTH - instr_width) // 2, HEIGHT - (8 * instr_scale) - 5, scale=instr_scale)
         display.update()
+        menu_render_us = time.ticks_diff(time.ticks_us(), render_start)
     except Exception as e:
         print("!!! ERROR IN draw_menu !!!"); sys.print_exception(e)
         try: # Try showing error on screen
@@ -122,49 +259,50 @@ def draw_menu():
         except: pass
 
 # --- MODIFIED FUNCTION ---
-def launch_game(filename):
+async def launch_game(game):
+    filename = game.get("file") or game["module"] + ".py"
     print(f"Attempting to launch: {filename}")
     display.set_pen(BLACK); display.clear()
     display.set_pen(WHITE); display.text(f"Startar...", 10, HEIGHT // 2 - 8, scale=2)
     display.update()
-    time.sleep(0.5)
+    await jobs.idle_for(500)
 
-    # Create a new, empty dictionary for the game's execution scope
+    # Create a new, empty dictionary for an old-style game's execution scope
     game_globals = {}
-    game_locals = game_globals # Often locals can be same as globals for simple exec
 
     # --- Explicit Memory Management ---
     print("--- Running GC before launch ---")
     gc.collect()
     print(f"Memory free before launch: {gc.mem_free()}")
+    telemetry.game = game.get("id", telemetry.GAME_MENU)
+    telemetry.record(telemetry.EV_LAUNCH)
     # --- End Memory Management ---
 
     try:
-        print(f"Opening {filename}")
-        with open(filename, "r") as f:
-            game_code = f.read()
-            print(f"Read {len(game_code)} bytes. Executing...")
-            # Execute the code within the dedicated scope
-            exec(game_code, game_globals, game_locals)
-            print(f"Execution finished normally for {filename}")
+        if "module" in game:
+            await run_module_game(game["module"])
+        else:
+            run_script_game(filename, game_globals)
 
-    except FileNotFoundError:
-        print(f"!!! ERROR: File not found: {filename}")
+    except GameMissing as e:
+        print(f"!!! ERROR: File not found: {filename} ({e})")
         display.set_pen(BLACK); display.clear(); display.set_pen(RED)
         display.text("FEL: Fil saknas", 10, 30, scale=2); # File Missing
         display_filename = filename if len(filename) < 25 else filename[:22] + "..."
         display.text(display_filename, 10, 60, scale=2)
-        display.set_pen(WHITE); display.text("Tryck A", 10, 90, scale=2)
+        display.set_pen(WHITE); display.text(str(e)[:120], 10, 90, WIDTH - 20, 1) # e.g. a module it imports
+        display.text("Tryck A", 10, HEIGHT - 30, scale=2)
         display.update()
-        while button_a.value() == 1: time.sleep(0.1)
+        await wait_for_a()
 
     except MemoryError as e:
         print(f"!!! MEMORY ERROR launching/running {filename} !!!"); sys.print_exception(e)
+        unload_games() # Free every loaded game before showing the error
         display.set_pen(BLACK); display.clear(); display.set_pen(RED)
         display.text("FEL: Minnesfel!", 10, 30, scale=2); # Memory Error
         display.set_pen(WHITE); display.text("Tryck A", 10, 90, scale=2)
         display.update()
-        while button_a.value() == 1: time.sleep(0.1)
+        await wait_for_a()
 
     except Exception as e:
         print(f"!!! ERROR DURING GAME EXECUTION ({filename}) !!!"); sys.print_exception(e)
@@ -172,61 +310,87 @@ def launch_game(filename):
         display.text("FEL i spel:", 10, 30, scale=2); # Error in game
         display_filename = filename if len(filename) < 25 else filename[:22] + "..."
         display.text(display_filename, 10, 60, scale=2)
-        display.set_pen(WHITE); display.text("Tryck A", 10, 90, scale=2)
+        message = f"{type(e).__name__}: {e}"
+        display.set_pen(WHITE); display.text(message[:120], 10, 90, WIDTH - 20, 1)
+        display.text("Tryck A", 10, HEIGHT - 30, scale=2)
         display.update()
-        while button_a.value() == 1: time.sleep(0.1)
+        await wait_for_a()
 
     finally:
         # --- Explicit Memory Cleanup ---
         print("--- Cleaning up game scope and running GC ---")
-        # Clear the dictionaries used for the game's scope
+        # Clear the dictionary used for an old-style game's scope
         game_globals.clear()
-        game_locals.clear()
         # Run garbage collection
         gc.collect()
         print(f"Memory free after cleanup: {gc.mem_free()}")
+        telemetry.record(telemetry.EV_EXIT)
+        telemetry.flush(force=True)
+        telemetry.game = telemetry.GAME_MENU
         # --- End Memory Cleanup ---
-        time.sleep(0.5) # Delay before redrawing menu
+        await jobs.idle_for(500) # Delay before redrawing menu
 
 # --- Main Loop ---
-print("Drawing initial menu...")
-draw_menu()
-print("Entering main loop...")
+# The launcher runs on an asyncio event loop. Besides the menu and the game
+# being played (console.run), it carries the background job worker (jobs.py:
+# housekeeping GC, preloading the highlighted game) and the leaderboard sync.
+# Old-style "file" games block the loop while they run.
+async def main():
+    global selected_index
+    asyncio.create_task(jobs.worker())
+    jobs.every("gc", jobs.GC_INTERVAL_MS, jobs.collect_garbage)
+    leaderboard.start()
+    if deadline.start_watchdog():
+        print(f"Watchdog started ({deadline.WATCHDOG_TIMEOUT_MS} ms)")
+    print("Drawing initial menu...")
+    draw_menu()
+    queue_preload()
+    print("Entering main loop...")
 
-while True:
-    try:
-        up_pressed = button_b.value() == 0
-        down_pressed = button_y.value() == 0
-        select_pressed = button_a.value() == 0
-
-        if up_pressed:
-            # print("Input: UP") # Optional debug
-            selected_index = (selected_index - 1) % len(games)
-            draw_menu()
-            time.sleep(0.2) # Debounce
-
-        elif down_pressed:
-            # print("Input: DOWN") # Optional debug
-            selected_index = (selected_index + 1) % len(games)
-            draw_menu()
-            time.sleep(0.2) # Debounce
-
-        elif select_pressed:
-            print(f"Input: SELECT (Index: {selected_index})")
-            selected_game = games[selected_index]
-            launch_game(selected_game["file"])
-            # Execution continues here AFTER launch_game finishes and cleanup runs
-            print("Returned from launch_game. Redrawing menu.")
-            draw_menu() # Redraw menu immediately after returning
-
-        if not (up_pressed or down_pressed or select_pressed):
-             time.sleep(0.05)
+    while True:
+        try:
+            up_pressed = button_b.value() == 0
+            down_pressed = button_y.value() == 0
+            select_pressed = button_a.value() == 0
 
-    except Exception as e:
-        print("!!! UNHANDLED ERROR IN MAIN LOOP !!!"); sys.print_exception(e)
-        try: # Attempt to display a critical error message
-            display.set_pen(BLACK); display.clear(); display.set_pen(RED)
-            display.text("Critical Err!", 10, 10, scale=2); display.text("Check REPL", 10, 40, scale=2)
-            display.update()
-        except: pass
-        time.sleep(5)
+            if up_pressed:
+                # print("Input: UP") # Optional debug
+                selected_index = (selected_index - 1) % len(games)
+                draw_menu()
+                queue_preload()
+                await jobs.idle_for(200) # Debounce
+
+            elif down_pressed:
+                # print("Input: DOWN") # Optional debug
+                selected_index = (selected_index + 1) % len(games)
+                draw_menu()
+                queue_preload()
+                await jobs.idle_for(200) # Debounce
+
+            elif select_pressed:
+                print(f"Input: SELECT (Index: {selected_index})")
+                selected_game = games[selected_index]
+                await launch_game(selected_game)
+                # Execution continues here AFTER launch_game finishes and cleanup runs
+                print("Returned from launch_game. Redrawing menu.")
+                print(idle.report())
+                print(jobs.report())
+                if leaderboard.enabled(): print(leaderboard.report())
+                draw_menu() # Redraw menu immediately after returning
+                queue_preload()
+
+            telemetry.flush()
+            if not (up_pressed or down_pressed or select_pressed):
+                 # Menu is static until a button is pressed: idle instead of polling
+                 await idle.wait((button_a, button_b, button_y), menu_render_us)
+
+        except Exception as e:
+            print("!!! UNHANDLED ERROR IN MAIN LOOP !!!"); sys.print_exception(e)
+            try: # Attempt to display a critical error message
+                display.set_pen(BLACK); display.clear(); display.set_pen(RED)
+                display.text("Critical Err!", 10, 10, scale=2); display.text("Check REPL", 10, 40, scale=2)
+                display.update()
+            except: pass
+            await asyncio.sleep_ms(5000)
+
+asyncio.run(main())
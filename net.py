@@ -0,0 +1,42 @@
+# Wi-Fi credentials and service addresses live in wifi_config.py on the Pico
+# (not committed). Every key is optional; a missing file disables networking.
+try:
+    import wifi_config
+except ImportError:
+    wifi_config = None
+
+try:
+    import network
+except ImportError:  # CPython host
+    network = None
+
+_wlan = None
+
+
+def setting(name, default=None):
+    """Returns a value from wifi_config.py, or default when it is not set."""
+    if wifi_config is None:
+        return default
+    return getattr(wifi_config, name, default)
+
+
+def connect():
+    """Starts joining the configured network without waiting for it."""
+    global _wlan
+    ssid = setting("WIFI_SSID")
+    if network is None or not ssid:
+        return False
+    if _wlan is None:
+        _wlan = network.WLAN(network.STA_IF)
+        _wlan.active(True)
+    if not _wlan.isconnected():
+        _wlan.connect(ssid, setting("WIFI_PASSWORD", ""))
+    return True
+
+
+def is_connected():
+    """True once the station interface has an address."""
+    if network is None:
+        return True  # Host: the loopback interface is always up
+    return _wlan is not None and _wlan.isconnected()
+
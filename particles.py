@@ -0,0 +1,193 @@
+import time
+from array import array
+
+# Positions and velocities are fixed point with 4 fractional bits so they fit
+# in int16 arrays (320 px * 16 = 5120).
+FRACTION_BITS = 4
+ONE = 1 << FRACTION_BITS
+
+# Unit directions spread around a circle, scaled by ONE (cos, sin pairs)
+_DIRECTIONS = (
+    (16, 0), (15, 6), (11, 11), (6, 15), (0, 16), (-6, 15), (-11, 11), (-15, 6),
+    (-16, 0), (-15, -6), (-11, -11), (-6, -15), (0, -16), (6, -15), (11, -11), (15, -6),
+)
+
+
+class ParticleSystem:
+    """Fixed-capacity particle pool stored in preallocated arrays.
+
+    Live particles are packed into slots [0, count); a dead particle is
+    replaced by the last live one, so update, emit and removal never allocate.
+    step() updates and draws everything within budget_us. When a frame runs
+    over budget the particles not yet drawn are dropped and later bursts emit
+    fewer, larger particles until the load eases. A burst into a full pool
+    first merges live particles pairwise to make room.
+    """
+
+    def __init__(self, width, height, capacity=96, budget_us=2000, gravity=2):
+        self.width = width
+        self.height = height
+        self.capacity = capacity
+        self.budget_us = budget_us
+        self.gravity = gravity
+        self.x = array("h", bytes(2 * capacity))
+        self.y = array("h", bytes(2 * capacity))
+        self.dx = array("h", bytes(2 * capacity))
+        self.dy = array("h", bytes(2 * capacity))
+        self.life = array("B", bytes(capacity))
+        self.size = array("B", bytes(capacity))
+        self.pen = array("I", bytes(4 * capacity))
+        self.count = 0
+        self.bounds = array("h", bytes(8))  # x0, y0, x1, y1 of the last step() (exclusive)
+        self.pressure = 0  # 0 = full detail; each level halves new bursts
+        self.min_pressure = 0  # Floor for pressure, raised when frames run late
+        self._seed = 1
+        # Counters
+        self.emitted = 0
+        self.dropped = 0
+        self.merged = 0
+        self.over_budget_frames = 0
+        self.last_step_us = 0
+        self.max_step_us = 0
+
+    def burst(self, x, y, pen, n=12, speed=3, life=12):
+        """Emits up to n particles from (x, y). Drops what does not fit."""
+        n >>= self.pressure
+        size = 2 << self.pressure  # Fewer particles, but larger, under pressure
+        free = self.capacity - self.count
+        if n > free:
+            # Pool full: make room by merging before dropping anything
+            self.merge()
+            free = self.capacity - self.count
+            if n > free:
+                self.dropped += n - free
+                n = free
+        if n <= 0:
+            return
+        fx = int(x) << FRACTION_BITS
+        fy = int(y) << FRACTION_BITS
+        seed = self._seed
+        stride = 16 // n if n < 16 else 1
+        i = self.count
+        for k in range(n):
+            # Cheap LCG for per-particle jitter; avoids random.* calls
+            seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+            ux, uy = _DIRECTIONS[(k * stride + (seed >> 16)) & 15]
+            mag = speed + ((seed >> 8) & 3)
+            self.x[i] = fx
+            self.y[i] = fy
+            self.dx[i] = ux * mag  # Directions are already scaled by ONE
+            self.dy[i] = uy * mag
+            self.life[i] = life + ((seed >> 4) & 7)
+            self.size[i] = size
+            self.pen[i] = pen
+            i += 1
+        self._seed = seed
+        self.count = i
+        self.emitted += n
+
+    def step(self, display):
+        """Advances and draws all particles, stopping at the frame budget."""
+        count = self.count
+        bounds = self.bounds
+        bounds[0] = bounds[1] = bounds[2] = bounds[3] = 0
+        if count == 0:
+            self.last_step_us = 0
+            return
+        start = time.ticks_us()
+        budget = self.budget_us
+        px = self.x
+        py = self.y
+        pdx = self.dx
+        pdy = self.dy
+        plife = self.life
+        psize = self.size
+        ppen = self.pen
+        max_x = self.width << FRACTION_BITS
+        max_y = self.height << FRACTION_BITS
+        gravity = self.gravity
+        current_pen = -1
+        x0 = y0 = 32767
+        x1 = y1 = -32768
+        i = 0
+        while i < count:
+            life = plife[i] - 1
+            x = px[i] + pdx[i]
+            y = py[i] + pdy[i]
+            if life <= 0 or x < 0 or x >= max_x or y >= max_y:
+                # Remove: move the last live particle into this slot
+                count -= 1
+                px[i] = px[count]
+                py[i] = py[count]
+                pdx[i] = pdx[count]
+                pdy[i] = pdy[count]
+                plife[i] = plife[count]
+                psize[i] = psize[count]
+                ppen[i] = ppen[count]
+                continue
+            px[i] = x
+            py[i] = y
+            pdy[i] += gravity
+            plife[i] = life
+            pen = ppen[i]
+            if pen != current_pen:
+                display.set_pen(pen)
+                current_pen = pen
+            s = psize[i]
+            x >>= FRACTION_BITS
+            y >>= FRACTION_BITS
+            display.rectangle(x, y, s, s)
+            if x < x0:
+                x0 = x
+            if y < y0:
+                y0 = y
+            if x + s > x1:
+                x1 = x + s
+            if y + s > y1:
+                y1 = y + s
+            i += 1
+            if not i & 15 and time.ticks_diff(time.ticks_us(), start) > budget:
+                # Out of time: drop everything not yet drawn this frame
+                self.dropped += count - i
+                count = i
+                self.over_budget_frames += 1
+                if self.pressure < 2:
+                    self.pressure += 1
+                break
+        else:
+            if self.pressure > self.min_pressure and count < self.capacity // 4:
+                self.pressure -= 1
+        self.count = count
+        if x1 > x0:
+            bounds[0] = x0
+            bounds[1] = y0
+            bounds[2] = x1
+            bounds[3] = y1
+        elapsed = time.ticks_diff(time.ticks_us(), start)
+        self.last_step_us = elapsed
+        if elapsed > self.max_step_us:
+            self.max_step_us = elapsed
+
+    def merge(self):
+        """Halves the live particles, folding each pair into one larger particle."""
+        count = self.count
+        half = count >> 1
+        for i in range(half):
+            j = count - 1 - i
+            # Survivor moves to the pair's midpoint and grows
+            self.x[i] = (self.x[i] + self.x[j]) >> 1
+            self.y[i] = (self.y[i] + self.y[j]) >> 1
+            if self.size[i] < 8:
+                self.size[i] += 1
+        self.count = count - half
+        self.merged += half
+
+    def limit(self, min_pressure):
+        """Keeps bursts thinned to at least min_pressure until limited again."""
+        self.min_pressure = min_pressure
+        if self.pressure < min_pressure:
+            self.pressure = min_pressure
+
+    def clear(self):
+        self.count = 0
+        self.pressure = self.min_pressure
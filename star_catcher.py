@@ -1,49 +1,44 @@
-import time
 import random
-import picographics
-from machine import Pin, SPI
-
-# --- Display Setup ---
-BACKLIGHT_PIN = 20
-display = picographics.PicoGraphics(display=picographics.DISPLAY_PICO_DISPLAY_2)
-WIDTH, HEIGHT = display.get_bounds()
-
-# --- Manual Backlight Control ---
-backlight = Pin(BACKLIGHT_PIN, Pin.OUT)
-backlight.value(1)
-
-# --- Button Setup ---
-button_a = Pin(12, Pin.IN, Pin.PULL_UP) # START / RESTART to Title
-button_b = Pin(13, Pin.IN, Pin.PULL_UP) # LEFT
-button_x = Pin(14, Pin.IN, Pin.PULL_UP) # Added for exit
-button_y = Pin(15, Pin.IN, Pin.PULL_UP) # RIGHT
-
-# --- Pen Colors ---
-BLACK = display.create_pen(0, 0, 0)
-WHITE = display.create_pen(255, 255, 255)
-GREY = display.create_pen(150, 150, 150)
-YELLOW = display.create_pen(255, 255, 0)
-RED = display.create_pen(255, 0, 0)
-ORANGE = display.create_pen(255, 165, 0)
-CYAN = display.create_pen(0, 255, 255)
+from array import array
+import telemetry
+import leaderboard
+from console import BUTTON_A, BUTTON_B, BUTTON_Y
+from deadline import LEVEL_SKIP_HUD, LEVEL_FEWER_EFFECTS
+from particles import ParticleSystem
+from entities import EntityStore
+
+FRAME_MS = 25  # Frame period the launcher paces this game at
+BATCH_DRAWS = False  # Draw straight to the display rather than through a DrawList
+
+# --- Display Setup (done in init) ---
+display = None
+WIDTH = 0
+HEIGHT = 0
+
+# --- Pen Colors (created in init) ---
+BLACK = WHITE = GREY = YELLOW = RED = ORANGE = CYAN = 0
+
+# --- Effects and Entities (allocated on first init, kept while loaded) ---
+sparks = None
+stars = None  # EntityStore of falling stars (x, y = centre)
+near_x = array("h")  # add_star() scratch: x of the stars near the top, sized to the store
 
 # --- Game Constants ---
 PLAYER_WIDTH = 20
 PLAYER_HEIGHT = 15
-PLAYER_START_Y_GLOBAL = HEIGHT - PLAYER_HEIGHT - 5
+PLAYER_START_Y_GLOBAL = 0  # Depends on HEIGHT, set in init
 PLAYER_SPEED = 7
 
 STAR_SIZE = 8
+MAX_STARS = 32  # Spawning pauses while this many stars are falling
+HUD_HEIGHT = 40  # Band at the top holding score, level, lives and misses
 STARS_PER_LEVEL = 5
 MAX_LIVES = 3
 STARS_PER_LIFE = 15
 
 SPAWN_AREA_WIDTH_FACTOR = 0.60
-spawn_area_width = int(WIDTH * SPAWN_AREA_WIDTH_FACTOR)
-min_spawn_x = (WIDTH - spawn_area_width) // 2
-max_spawn_x = min_spawn_x + spawn_area_width
-min_spawn_x = max(STAR_SIZE // 2, min_spawn_x)
-max_spawn_x = min(WIDTH - STAR_SIZE // 2, max_spawn_x)
+min_spawn_x = 0  # Spawn area depends on WIDTH, set in init
+max_spawn_x = 0
 
 MIN_HORIZONTAL_SEPARATION = STAR_SIZE * 3
 MIN_VERTICAL_START_SEPARATION = STAR_SIZE * 2
@@ -54,38 +49,40 @@ STATE_PLAYING = "playing"
 STATE_GAME_OVER = "game_over"
 
 # --- Game Variables ---
+ctx = None
 player_x = 0
 score = 0
+result_rank = 0  # Leaderboard position of the last finished game (0 = outside)
 level = 0
 game_speed = 0
 stars_collected_this_level = 0
-stars = []
 lives = 0
 missed_stars_count = 0
 game_state = STATE_TITLE
-last_star_time = 0
+screen_drawn = False  # Whether the title/game over screen is already on display
+star_timer_ms = 0  # Time since the last star spawned
 initial_star_interval = 2200
 star_interval_reduction_per_level = 25
 star_interval = 0
-
-# --- Double Click Exit Logic Variables ---
-last_x_press_time = 0
-x_pressed_waiting_for_second = False
-DOUBLE_CLICK_INTERVAL_MS = 300
+# HUD values on screen; while degraded the band is only redrawn when they change
+hud_score = hud_level = hud_lives = hud_missed = -1
+hud_damaged = False  # Sparks reached into the HUD band last frame
 
 def reset_game():
     global player_x, score, level, game_speed, stars_collected_this_level
-    global stars, lives, missed_stars_count, game_state, last_star_time, star_interval
+    global lives, missed_stars_count, game_state, star_timer_ms, star_interval, hud_score
     player_x = WIDTH // 2 - PLAYER_WIDTH // 2
     score = 0
     level = 1
     game_speed = 2  # Increased from 1 to 2 for faster stars
     stars_collected_this_level = 0
-    stars = []
+    stars.clear()
+    sparks.clear()
     lives = MAX_LIVES
     missed_stars_count = 0
-    last_star_time = time.ticks_ms()
+    star_timer_ms = 0
     star_interval = initial_star_interval
+    hud_score = -1  # Screen was cleared for the new game
     print("Spelet återställt! Hastighet låst till 2.")
 
 def draw_player(x, y_base):
@@ -108,68 +105,98 @@ def draw_player(x, y_base):
     display.triangle(flare_p1_x, flare_p1_y, flare_p2_x, flare_p2_y, flare_p3_x, flare_p3_y)
 
 def add_star():
+    global near_x
     spawn_attempts = 10
     best_star_x = -1
     start_y = 0 - STAR_SIZE
-    for sx, sy in stars:
-        if sy < MIN_VERTICAL_START_SEPARATION:
-            return
+    proximity_check_depth = STAR_SIZE * 5
+    store = stars
+    near = near_x
+    if len(near) < store.capacity:  # First call, or the store was replaced
+        near = near_x = array("h", bytes(2 * store.capacity))
+    flags = store.flags
+    star_x = store.x
+    # One pass over the stars: give up if one has only just started
+    # falling, and note where the stars near the top are. Walks the y column
+    # slot by slot (cheaper than going through live); a free slot keeps a
+    # stale y, so its flag is checked on the rare hit.
+    n_near = 0
+    i = 0
+    for y in store.y:
+        if y < proximity_check_depth and flags[i]:
+            if y < MIN_VERTICAL_START_SEPARATION:
+                return
+            near[n_near] = star_x[i]
+            n_near += 1
+        i += 1
     if max_spawn_x <= min_spawn_x:
         fallback_min = max(STAR_SIZE // 2, WIDTH // 4)
         fallback_max = min(WIDTH - STAR_SIZE // 2, WIDTH * 3 // 4)
         if fallback_max > fallback_min: best_star_x = random.randint(fallback_min, fallback_max)
         else: best_star_x = WIDTH // 2
-        stars.append([best_star_x, start_y])
+        store.spawn(best_star_x, start_y, STAR_SIZE, STAR_SIZE)
         return
     for attempt in range(spawn_attempts):
         potential_star_x = random.randint(min_spawn_x, max_spawn_x)
         too_close_horizontally = False
-        proximity_check_depth = STAR_SIZE * 5
-        for sx, sy in stars:
-            if sy < proximity_check_depth:
-                if abs(potential_star_x - sx) < MIN_HORIZONTAL_SEPARATION:
-                    too_close_horizontally = True
-                    break
+        for j in range(n_near):
+            if abs(potential_star_x - near[j]) < MIN_HORIZONTAL_SEPARATION:
+                too_close_horizontally = True
+                break
         if not too_close_horizontally:
             best_star_x = potential_star_x
             break
     if best_star_x == -1:
          best_star_x = random.randint(min_spawn_x, max_spawn_x)
-    stars.append([best_star_x, start_y])
+    store.spawn(best_star_x, start_y, STAR_SIZE, STAR_SIZE)
 
 def move_stars():
-    global stars, lives, missed_stars_count
-    new_stars = []
+    global lives, missed_stars_count
     life_lost_this_frame = False
-    for star in stars:
-        star[1] += game_speed
-        if star[1] >= HEIGHT:
+    live = stars.live
+    star_y = stars.y
+    # Backwards, so a kill only moves an already visited star into the hole
+    speed = game_speed
+    bottom = HEIGHT
+    for k in range(stars.count - 1, -1, -1):
+        i = live[k]
+        y = star_y[i] + speed
+        star_y[i] = y
+        if y >= bottom:
+            stars.kill(i)
             missed_stars_count += 1
             if missed_stars_count >= STARS_PER_LIFE:
                 lives -= 1
                 missed_stars_count = 0
                 life_lost_this_frame = True
                 print(f"Liv förlorat! Liv kvar: {lives}")
-        elif star[1] < HEIGHT + STAR_SIZE:
-             new_stars.append(star)
-    stars = new_stars
+                telemetry.record(telemetry.EV_LIFE_LOST, score=score, value=lives)
     return life_lost_this_frame
 
-def draw_stars():
+def draw_stars(top=-STAR_SIZE):
     display.set_pen(YELLOW)
-    for star_x, star_y in stars:
-        if star_y > -STAR_SIZE:
-             display.circle(star_x, star_y, STAR_SIZE // 2)
+    flags = stars.flags
+    star_x = stars.x
+    radius = STAR_SIZE // 2
+    # Slot by slot like add_star; all stars share one pen, so order does not matter
+    i = 0
+    for y in stars.y:
+        if y > top and flags[i]:
+            display.circle(star_x[i], y, radius)
+        i += 1
 
 def check_collisions():
-    global score, stars_collected_this_level, stars, level, game_speed
+    global score, stars_collected_this_level, level, game_speed
     player_rect_left = player_x
     player_rect_right = player_x + PLAYER_WIDTH
     player_rect_top = PLAYER_START_Y_GLOBAL
     player_rect_bottom = PLAYER_START_Y_GLOBAL + PLAYER_HEIGHT
-    remaining_stars = []
     collided_this_frame = False
-    for star_x, star_y in stars:
+    live = stars.live
+    for k in range(stars.count - 1, -1, -1):
+        i = live[k]
+        star_x = stars.x[i]
+        star_y = stars.y[i]
         star_half_size = STAR_SIZE // 2
         star_rect_left = star_x - star_half_size
         star_rect_right = star_x + star_half_size
@@ -179,7 +206,9 @@ def check_collisions():
             player_rect_right > star_rect_left and
             player_rect_top < star_rect_bottom and
             player_rect_bottom > star_rect_top):
+            stars.kill(i)
             if not collided_this_frame:
+                sparks.burst(star_x, star_y, YELLOW, n=10)
                 score += 10 * level
                 stars_collected_this_level += 1
                 collided_this_frame = True
@@ -188,9 +217,7 @@ def check_collisions():
                     stars_collected_this_level = 0
                     game_speed += 1  # Increase star speed each level
                     print(f"Ny nivå! Nådde nivå {level}, Hastighet: {game_speed}")
-        else:
-            remaining_stars.append([star_x, star_y])
-    stars = remaining_stars
+                    telemetry.record(telemetry.EV_LEVEL, score=score, value=level)
 
 def draw_ui():
     score_text = f"Poäng: {score}"
@@ -220,21 +247,30 @@ def draw_game_over():
     display.set_pen(RED)
     game_over_text = "SPELET SLUT"
     score_text = f"Slutpoäng: {score}"
+    show_rank = leaderboard.enabled()
+    rank_text = leaderboard.rank_text(telemetry.GAME_STAR_CATCHER, result_rank) if show_rank else ""
     restart_text = "Tryck A för Titel"
     text_scale_large = 4
     text_scale_medium = 2
     go_width = display.measure_text(game_over_text, scale=text_scale_large)
     score_width = display.measure_text(score_text, scale=text_scale_medium)
+    rank_width = display.measure_text(rank_text, scale=text_scale_medium)
     restart_width = display.measure_text(restart_text, scale=text_scale_medium)
     go_x = (WIDTH - go_width) // 2
     go_y = HEIGHT // 2 - (8 * text_scale_large)
     score_x = (WIDTH - score_width) // 2
     score_y = go_y + (8 * text_scale_large) + 10
+    rank_x = (WIDTH - rank_width) // 2
+    rank_y = score_y + (8 * text_scale_medium) + 10
     restart_x = (WIDTH - restart_width) // 2
-    restart_y = score_y + (8 * text_scale_medium) + 10
+    restart_y = (rank_y if show_rank else score_y) + (8 * text_scale_medium) + 10
     display.text(game_over_text, go_x, go_y, scale=text_scale_large)
     display.set_pen(WHITE)
     display.text(score_text, score_x, score_y, scale=text_scale_medium)
+    if show_rank:
+        display.set_pen(YELLOW)
+        display.text(rank_text, rank_x, rank_y, scale=text_scale_medium)
+        display.set_pen(WHITE)
     display.text(restart_text, restart_x, restart_y, scale=text_scale_medium)
 
 def draw_title_screen():
@@ -263,84 +299,131 @@ def draw_title_screen():
     title_ship_y = start_y + (8 * text_scale_start) + 20
     draw_player(title_ship_x, title_ship_y)
 
-while True:
-    current_time_ms = time.ticks_ms()
-
-    if game_state == STATE_PLAYING or game_state == STATE_GAME_OVER:
-        if button_x.value() == 0:
-            if not x_pressed_waiting_for_second:
-                last_x_press_time = current_time_ms
-                x_pressed_waiting_for_second = True
-        else:
-            if x_pressed_waiting_for_second:
-                if time.ticks_diff(current_time_ms, last_x_press_time) < DOUBLE_CLICK_INTERVAL_MS:
-                    pass
-                else:
-                    x_pressed_waiting_for_second = False
-
-        if x_pressed_waiting_for_second and button_x.value() == 0:
-             if time.ticks_diff(current_time_ms, last_x_press_time) < DOUBLE_CLICK_INTERVAL_MS:
-                 print("X Double Click: Exiting game!")
-                 break
-             else:
-                 last_x_press_time = current_time_ms
-
-    if x_pressed_waiting_for_second and button_x.value() == 1:
-        if time.ticks_diff(current_time_ms, last_x_press_time) >= DOUBLE_CLICK_INTERVAL_MS:
-             x_pressed_waiting_for_second = False
-
+# --- Game Lifecycle (driven by the launcher, see console.py) ---
+def init(context):
+    """Sets up display resources on first launch and shows the title screen."""
+    global ctx, display, WIDTH, HEIGHT, BLACK, WHITE, GREY, YELLOW, RED, ORANGE, CYAN
+    global sparks, stars, PLAYER_START_Y_GLOBAL, min_spawn_x, max_spawn_x, game_state, screen_drawn
+    ctx = context
+    display = context.gfx  # The display, or a DrawList flushed by the launcher
+    if sparks is None:
+        WIDTH, HEIGHT = context.width, context.height
+        BLACK = display.create_pen(0, 0, 0)
+        WHITE = display.create_pen(255, 255, 255)
+        GREY = display.create_pen(150, 150, 150)
+        YELLOW = display.create_pen(255, 255, 0)
+        RED = display.create_pen(255, 0, 0)
+        ORANGE = display.create_pen(255, 165, 0)
+        CYAN = display.create_pen(0, 255, 255)
+        sparks = ParticleSystem(WIDTH, HEIGHT, capacity=64, budget_us=1500)
+        stars = EntityStore(MAX_STARS)
+        PLAYER_START_Y_GLOBAL = HEIGHT - PLAYER_HEIGHT - 5
+        spawn_area_width = int(WIDTH * SPAWN_AREA_WIDTH_FACTOR)
+        min_spawn_x = (WIDTH - spawn_area_width) // 2
+        max_spawn_x = min_spawn_x + spawn_area_width
+        min_spawn_x = max(STAR_SIZE // 2, min_spawn_x)
+        max_spawn_x = min(WIDTH - STAR_SIZE // 2, max_spawn_x)
+    game_state = STATE_TITLE
+    screen_drawn = False
+
+
+def update(dt, buttons):
+    """Advances the game by one frame."""
+    global game_state, player_x, star_interval, star_timer_ms, screen_drawn, result_rank
+    ctx.static = game_state != STATE_PLAYING
     if game_state == STATE_TITLE:
-        if button_a.value() == 0:
+        if buttons.pressed(BUTTON_A):
             print("Startar spel!")
             reset_game()
             game_state = STATE_PLAYING
-            time.sleep(0.2)
-            continue
-        display.set_pen(BLACK)
-        display.clear()
-        draw_title_screen()
+            ctx.static = False
 
     elif game_state == STATE_PLAYING:
-        if button_b.value() == 0: player_x -= PLAYER_SPEED
-        if button_y.value() == 0: player_x += PLAYER_SPEED
+        sparks.limit(2 if ctx.degrade_level >= LEVEL_FEWER_EFFECTS else 0)
+        if buttons.held(BUTTON_B): player_x -= PLAYER_SPEED
+        if buttons.held(BUTTON_Y): player_x += PLAYER_SPEED
         player_x = max(0, min(player_x, WIDTH - PLAYER_WIDTH))
 
         life_lost_event = move_stars()
         if life_lost_event and lives <= 0:
             game_state = STATE_GAME_OVER
+            screen_drawn = False
+            ctx.static = True
             print("Spelet slut!")
-            time.sleep(0.2)
-            continue
+            telemetry.record(telemetry.EV_GAME_OVER, score=score, value=level)
+            # Queued for upload in the background; the rank comes from the cache
+            result_rank = leaderboard.submit(telemetry.GAME_STAR_CATCHER, score)
+            return
         check_collisions()
 
         star_interval = max(200, initial_star_interval - (level * star_interval_reduction_per_level))
-        current_time = time.ticks_ms()
-        if time.ticks_diff(current_time, last_star_time) > star_interval:
+        star_timer_ms += dt
+        if star_timer_ms > star_interval:
             add_star()
-            last_star_time = current_time
-
-        display.set_pen(BLACK)
-        display.clear()
-        draw_player(player_x, PLAYER_START_Y_GLOBAL)
-        draw_stars()
-        draw_ui()
+            star_timer_ms = 0
 
     elif game_state == STATE_GAME_OVER:
-        if button_a.value() == 0:
+        if buttons.pressed(BUTTON_A):
             print("Återgår till titelskärm")
             game_state = STATE_TITLE
-            x_pressed_waiting_for_second = False
-            time.sleep(0.2)
-            continue
+            screen_drawn = False
+
+
+def draw(gfx):
+    """Renders the current state into gfx (the display set up in init).
+
+    Title and game over are drawn once.
+    """
+    global screen_drawn, hud_score, hud_level, hud_lives, hud_missed, hud_damaged
+    if game_state == STATE_PLAYING:
+        degraded = ctx.degrade_level >= LEVEL_SKIP_HUD
+        if (degraded and not hud_damaged and score == hud_score and level == hud_level
+                and lives == hud_lives and missed_stars_count == hud_missed):
+            # HUD unchanged: keep it and clear only the playfield below it
+            display.set_pen(BLACK)
+            display.rectangle(0, HUD_HEIGHT, WIDTH, HEIGHT - HUD_HEIGHT)
+            redraw_hud = False
+        else:
+            display.set_pen(BLACK)
+            display.clear()
+            redraw_hud = True
+        draw_player(player_x, PLAYER_START_Y_GLOBAL)
+        # While degraded, stars only appear below the HUD band, which may not be cleared
+        draw_stars(HUD_HEIGHT + STAR_SIZE // 2 if degraded else -STAR_SIZE)
+        sparks.step(display)
+        if redraw_hud:
+            if ctx.batched:
+                display.barrier()  # The HUD covers stars and sparks passing under it
+            draw_ui()
+        if degraded:
+            hud_score = score
+            hud_level = level
+            hud_lives = lives
+            hud_missed = missed_stars_count
+            b = sparks.bounds
+            hud_damaged = b[2] > b[0] and b[1] < HUD_HEIGHT
+        else:
+            hud_score = -1
+    elif not screen_drawn:
         display.set_pen(BLACK)
         display.clear()
-        draw_game_over()
+        if game_state == STATE_TITLE:
+            draw_title_screen()
+        else:
+            draw_game_over()
+        screen_drawn = True
+
 
-    display.update()
+def suspend():
+    """Player left for the menu; the next launch starts from the title."""
+    global game_state
+    sparks.clear()
+    stars.clear()
+    game_state = STATE_TITLE
 
-    time.sleep(0.02)
 
-print("Star Catcher game loop finished.")
-display.set_pen(BLACK)
-display.clear()
-display.update()
\ No newline at end of file
+def shutdown():
+    """Releases the buffers allocated in init before the module is unloaded."""
+    global sparks, stars
+    sparks = None
+    stars = None
@@ -0,0 +1,184 @@
+import gc
+import struct
+import time
+import net
+
+try:
+    import socket
+except ImportError:
+    import usocket as socket
+
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython host (telemetry_collector.py loopback check)
+    def ticks_ms():
+        return int(time.monotonic() * 1000) & 0x3FFFFFFF
+
+    def ticks_diff(a, b):
+        return a - b
+
+# --- Wire Format ---
+# Every datagram is a header followed by up to MAX_BATCH fixed-size records.
+# Header: magic, version, record count, records dropped since the last datagram.
+HEADER_FORMAT = "<2sBBH"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b"PT"
+VERSION = 1
+# Record: seq, event, game, ticks_ms, frame_us, heap_free, score, value.
+# heap_free is sampled once per datagram sent, not per record: gc.mem_free()
+# walks the whole heap, too slow to call every frame.
+RECORD_FORMAT = "<HBBIIIii"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# --- Events ---
+# Every record carries heap_free. The other fields, by event (unlisted ones are 0):
+EV_FRAME = 1  # frame_us = frame time, score
+EV_LAUNCH = 2
+EV_EXIT = 3
+EV_LEVEL = 4  # score, value = level reached
+EV_LIFE_LOST = 5  # score, value = lives left
+EV_GAME_OVER = 6  # score, value = level (Star Catcher)
+EV_WIN = 7  # score, value = lives left
+EV_IDLE = 8  # frame_us = wakeup latency, value = ms spent idle
+EV_DEGRADE = 9  # value = degradation level entered (deadline.py)
+EV_DEADLINE = 10  # On exit: frame_us = worst late frame, value = missed deadlines
+SCORE_EVENTS = (EV_FRAME, EV_LEVEL, EV_LIFE_LOST, EV_GAME_OVER, EV_WIN)  # score is the game's score
+EVENT_NAMES = {
+    EV_FRAME: "frame",
+    EV_LAUNCH: "launch",
+    EV_EXIT: "exit",
+    EV_LEVEL: "level",
+    EV_LIFE_LOST: "life_lost",
+    EV_GAME_OVER: "game_over",
+    EV_WIN: "win",
+    EV_IDLE: "idle",
+    EV_DEGRADE: "degrade",
+    EV_DEADLINE: "deadline",
+}
+
+# --- Games ---
+GAME_MENU = 0
+GAME_STAR_CATCHER = 1
+GAME_BREAKOUT = 2
+
+# --- Buffering ---
+CAPACITY = 64  # Records held in the ring buffer
+MAX_BATCH = 20  # Records per datagram (20 * 24 + 6 = 486 bytes, below any MTU)
+FLUSH_INTERVAL_MS = 250  # Send a partial batch after this long
+DEFAULT_PORT = 5005
+
+_ring = bytearray(CAPACITY * RECORD_SIZE)
+_ring_mv = memoryview(_ring)
+_packet = bytearray(HEADER_SIZE + MAX_BATCH * RECORD_SIZE)
+_packet_mv = memoryview(_packet)
+_head = 0  # Index of the oldest buffered record
+_count = 0
+_seq = 0
+_dropped = 0  # Dropped since the last datagram, reported in its header
+_dropped_total = 0
+_sent_total = 0
+_last_flush_ms = 0
+_heap = 0  # gc.mem_free() at the last datagram, stamped on the records after it
+_sock = None
+_addr = None
+game = GAME_MENU
+
+
+def init(host=None, port=None):
+    """Opens the non-blocking UDP socket. Returns False if telemetry stays off."""
+    global _sock, _addr, _last_flush_ms
+    if _sock is not None:
+        return True
+    if host is None:
+        host = net.setting("TELEMETRY_HOST")
+    if port is None:
+        port = net.setting("TELEMETRY_PORT", DEFAULT_PORT)
+    if not host:
+        return False
+    try:
+        # Numeric addresses only: a DNS lookup here could block the caller.
+        _addr = socket.getaddrinfo(host, port)[0][-1]
+        _sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        _sock.setblocking(False)
+    except OSError as e:
+        print(f"Telemetry disabled: {e}")
+        _sock = None
+        return False
+    _last_flush_ms = ticks_ms()
+    _sample_heap()
+    return True
+
+
+def _sample_heap():
+    global _heap
+    try:
+        _heap = gc.mem_free()
+    except AttributeError:  # CPython host
+        _heap = 0
+
+
+def enabled():
+    return _sock is not None
+
+
+def record(event, frame_us=0, score=0, value=0):
+    """Appends one record to the ring buffer. Drops it if the buffer is full."""
+    global _count, _seq, _dropped, _dropped_total
+    if _sock is None:
+        return
+    if _count >= CAPACITY:
+        _dropped += 1
+        _dropped_total += 1
+        return
+    slot = (_head + _count) % CAPACITY
+    struct.pack_into(
+        RECORD_FORMAT, _ring, slot * RECORD_SIZE,
+        _seq, event, game, ticks_ms() & 0xFFFFFFFF,
+        min(frame_us, 0xFFFFFFFF), _heap, score, value,
+    )
+    _seq = (_seq + 1) & 0xFFFF
+    _count += 1
+
+
+def flush(force=False):
+    """Sends at most one datagram. Never blocks; a batch the socket refuses is dropped."""
+    global _head, _count, _dropped, _dropped_total, _sent_total, _last_flush_ms
+    if _sock is None or _count == 0:
+        return
+    now = ticks_ms()
+    if not force and _count < MAX_BATCH and ticks_diff(now, _last_flush_ms) < FLUSH_INTERVAL_MS:
+        return
+    _last_flush_ms = now
+    n = min(_count, MAX_BATCH)
+    # Copy the batch out of the ring in at most two contiguous slices
+    first = min(n, CAPACITY - _head)
+    start = _head * RECORD_SIZE
+    _packet_mv[HEADER_SIZE:HEADER_SIZE + first * RECORD_SIZE] = _ring_mv[start:start + first * RECORD_SIZE]
+    if first < n:
+        rest = (n - first) * RECORD_SIZE
+        _packet_mv[HEADER_SIZE + first * RECORD_SIZE:HEADER_SIZE + n * RECORD_SIZE] = _ring_mv[0:rest]
+    struct.pack_into(HEADER_FORMAT, _packet, 0, MAGIC, VERSION, n, min(_dropped, 0xFFFF))
+    _head = (_head + n) % CAPACITY
+    _count -= n
+    try:
+        _sock.sendto(_packet_mv[:HEADER_SIZE + n * RECORD_SIZE], _addr)
+        _sent_total += n
+        _dropped = 0
+    except OSError:  # EAGAIN, no route, Wi-Fi down: lose the batch
+        _dropped += n
+        _dropped_total += n
+    _sample_heap()
+
+
+def stats():
+    """Returns (sent, dropped, buffered) record counts."""
+    return _sent_total, _dropped_total, _count
+
+
+def close():
+    global _sock, _head, _count
+    if _sock is not None:
+        _sock.close()
+    _sock = None
+    _head = 0
+    _count = 0
@@ -0,0 +1,193 @@
+"""Host-side collector for the console's UDP telemetry stream.
+
+Run on a computer on the same network as the Pico:
+
+    python telemetry_collector.py --port 5005
+
+and set TELEMETRY_HOST / TELEMETRY_PORT in wifi_config.py on the Pico.
+`python telemetry_collector.py --loopback 500` sends synthetic records
+through telemetry.py to 127.0.0.1 and prints what was aggregated.
+"""
+import argparse
+import socket
+import struct
+import sys
+import time
+
+import telemetry
+
+GAME_NAMES = {
+    telemetry.GAME_MENU: "menu",
+    telemetry.GAME_STAR_CATCHER: "star_catcher",
+    telemetry.GAME_BREAKOUT: "breakout",
+}
+
+
+class GameStats:
+    """Running aggregates for one game id."""
+
+    def __init__(self):
+        self.frames = 0
+        self.frame_us_total = 0
+        self.frame_us_max = 0
+        self.frame_us = []  # Recent samples, for percentiles
+        self.heap_min = None
+        self.heap_last = None
+        self.score_max = 0
+        self.events = {}
+
+    def add(self, event, frame_us, heap_free, score, value):
+        self.events[event] = self.events.get(event, 0) + 1
+        if event == telemetry.EV_FRAME:
+            self.frames += 1
+            self.frame_us_total += frame_us
+            self.frame_us_max = max(self.frame_us_max, frame_us)
+            self.frame_us.append(frame_us)
+            if len(self.frame_us) > 4096:
+                del self.frame_us[:2048]
+        if heap_free:
+            self.heap_last = heap_free
+            if self.heap_min is None or heap_free < self.heap_min:
+                self.heap_min = heap_free
+        if event in telemetry.SCORE_EVENTS:
+            self.score_max = max(self.score_max, score)
+
+    def percentile(self, p):
+        if not self.frame_us:
+            return 0
+        ordered = sorted(self.frame_us)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class Collector:
+    """Parses datagrams and keeps per-game aggregates and loss counters."""
+
+    def __init__(self):
+        self.games = {}
+        self.datagrams = 0
+        self.records = 0
+        self.bad_datagrams = 0
+        self.device_dropped = 0  # Reported by the device (ring overflow / send failure)
+        self.seq_gaps = 0  # Records lost in transit
+        self._next_seq = None
+
+    def feed(self, data):
+        if len(data) < telemetry.HEADER_SIZE:
+            self.bad_datagrams += 1
+            return
+        magic, version, count, dropped = struct.unpack_from(telemetry.HEADER_FORMAT, data, 0)
+        expected = telemetry.HEADER_SIZE + count * telemetry.RECORD_SIZE
+        if magic != telemetry.MAGIC or version != telemetry.VERSION or len(data) != expected:
+            self.bad_datagrams += 1
+            return
+        self.datagrams += 1
+        self.device_dropped += dropped
+        offset = telemetry.HEADER_SIZE
+        for _ in range(count):
+            seq, event, game, _ticks, frame_us, heap_free, score, value = struct.unpack_from(
+                telemetry.RECORD_FORMAT, data, offset
+            )
+            offset += telemetry.RECORD_SIZE
+            if self._next_seq is not None and seq != self._next_seq:
+                self.seq_gaps += (seq - self._next_seq) & 0xFFFF
+            self._next_seq = (seq + 1) & 0xFFFF
+            self.records += 1
+            stats = self.games.get(game)
+            if stats is None:
+                stats = self.games[game] = GameStats()
+            stats.add(event, frame_us, heap_free, score, value)
+
+    def summary(self):
+        lines = [
+            f"datagrams={self.datagrams} records={self.records} "
+            f"device_dropped={self.device_dropped} seq_gaps={self.seq_gaps} bad={self.bad_datagrams}"
+        ]
+        for game in sorted(self.games):
+            s = self.games[game]
+            avg = s.frame_us_total // s.frames if s.frames else 0
+            events = ", ".join(
+                f"{telemetry.EVENT_NAMES.get(e, e)}={n}" for e, n in sorted(s.events.items())
+            )
+            lines.append(
+                f"  {GAME_NAMES.get(game, game)}: frames={s.frames} avg={avg}us "
+                f"p95={s.percentile(95)}us max={s.frame_us_max}us heap_min={s.heap_min} "
+                f"heap_last={s.heap_last} score_max={s.score_max} [{events}]"
+            )
+        return "\n".join(lines)
+
+
+def serve(port, report_every_s):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("0.0.0.0", port))
+    sock.settimeout(0.5)
+    collector = Collector()
+    last_report = time.monotonic()
+    print(f"Listening for telemetry on udp/{port}")
+    try:
+        while True:
+            try:
+                data, _ = sock.recvfrom(2048)
+                collector.feed(data)
+            except socket.timeout:
+                pass
+            if time.monotonic() - last_report >= report_every_s:
+                last_report = time.monotonic()
+                print(collector.summary())
+    except KeyboardInterrupt:
+        print(collector.summary())
+
+
+def loopback(count):
+    """Pushes count synthetic records through telemetry.py to a local collector."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(0.2)
+    port = sock.getsockname()[1]
+    if not telemetry.init("127.0.0.1", port):
+        print("telemetry.init failed")
+        return 1
+    collector = Collector()
+    telemetry.game = telemetry.GAME_STAR_CATCHER
+    for i in range(count):
+        telemetry.record(telemetry.EV_FRAME, frame_us=15000 + (i % 7) * 1000, score=i * 10)
+        if i % 50 == 49:
+            telemetry.record(telemetry.EV_LEVEL, score=i * 10, value=i // 50 + 1)
+        telemetry.flush()
+    # Exit summary: its fields must not count as frames or as a score
+    telemetry.record(telemetry.EV_DEADLINE, frame_us=90000, value=count)
+    telemetry.flush(force=True)
+    while telemetry.stats()[2]:
+        telemetry.flush(force=True)
+    while True:
+        try:
+            collector.feed(sock.recvfrom(2048)[0])
+        except socket.timeout:
+            break
+    telemetry.close()
+    print(collector.summary())
+    sent, dropped, _ = telemetry.stats()
+    received = collector.records
+    if received + collector.device_dropped < sent:
+        print(f"Lost {sent - received} records on loopback")
+        return 1
+    stats = collector.games.get(telemetry.GAME_STAR_CATCHER)
+    if stats is not None and stats.score_max > (count - 1) * 10:
+        print(f"score_max {stats.score_max} taken from a record without a score")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=telemetry.DEFAULT_PORT)
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between summaries")
+    parser.add_argument("--loopback", type=int, metavar="N", help="send N synthetic records to localhost and exit")
+    args = parser.parse_args(argv)
+    if args.loopback:
+        return loopback(args.loopback)
+    serve(args.port, args.report_every)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())